@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Security
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 from typing import List, Optional
-from app.core.security.api_key import verify_api_key, api_key_header
+from app.core.security.api_key import (
+    CachedAPIKey,
+    verify_api_key,
+    get_current_api_key,
+    api_key_header,
+    invalidate_api_key_cache
+)
 from app.models.auth.api_key import Role, APIKey
 from app.models.auth.user import User, UserStatus
 from app.core.security.user import create_user, get_user
@@ -15,21 +22,25 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 
 # Dependency to verify admin API key
 async def verify_admin_api_key(
+    request: Request,
     api_key: str = Security(api_key_header),
     db: Session = Depends(get_db)
-) -> APIKey:
-    if not api_key:
-        raise HTTPException(
-            status_code=403,
-            detail="API key required"
-        )
-    
-    key = verify_api_key(db, api_key)
-    if not key:
-        raise HTTPException(
-            status_code=403,
-            detail="Invalid or inactive API key"
-        )
+) -> CachedAPIKey:
+    key = get_current_api_key(request)
+    if key is None:
+        if not api_key:
+            raise HTTPException(
+                status_code=403,
+                detail="API key required"
+            )
+
+        key = await run_in_threadpool(verify_api_key, db, api_key)
+        if not key:
+            raise HTTPException(
+                status_code=403,
+                detail="Invalid or inactive API key"
+            )
+        request.state.api_key = key
     
     if key.role != Role.ADMIN:
         raise HTTPException(
@@ -81,12 +92,15 @@ class APIKeyResponse(BaseModel):
     last_used: Optional[datetime]
     is_active: bool
 
+class MessageResponse(BaseModel):
+    message: str
+
 # User Management Endpoints
 @router.post("/users", response_model=UserResponse)
 async def create_new_user(
     user: UserCreate,
     db: Session = Depends(get_db),
-    _: APIKey = Depends(verify_admin_api_key)
+    _: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """Create a new user"""
     try:
@@ -116,7 +130,7 @@ async def create_new_user(
 async def list_users(
     show_inactive: bool = Query(False, description="Include inactive users"),
     db: Session = Depends(get_db),
-    _: APIKey = Depends(verify_admin_api_key)
+    _: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """List all users"""
     from sqlmodel import select
@@ -142,7 +156,7 @@ async def list_users(
 async def get_user_info(
     user_id: int,
     db: Session = Depends(get_db),
-    _: APIKey = Depends(verify_admin_api_key)
+    _: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """Get detailed information about a user"""
     user = get_user(db, user_id)
@@ -159,11 +173,11 @@ async def get_user_info(
         active_api_keys=sum(1 for key in user.api_keys if key.is_active)
     )
 
-@router.post("/users/{user_id}/deactivate")
+@router.post("/users/{user_id}/deactivate", response_model=MessageResponse)
 async def deactivate_user(
     user_id: int,
     db: Session = Depends(get_db),
-    api_key: APIKey = Depends(verify_admin_api_key)
+    api_key: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """Deactivate a user and all their API keys"""
     user = get_user(db, user_id)
@@ -176,6 +190,7 @@ async def deactivate_user(
         key.is_active = False
     
     db.commit()
+    invalidate_api_key_cache(user_id=user_id)
     
     audit_log(
         action=AuditAction.USER_DEACTIVATED,
@@ -185,11 +200,11 @@ async def deactivate_user(
     
     return {"message": f"Successfully deactivated user {user.name} and all their API keys"}
 
-@router.post("/users/{user_id}/activate")
+@router.post("/users/{user_id}/activate", response_model=MessageResponse)
 async def activate_user(
     user_id: int,
     db: Session = Depends(get_db),
-    api_key: APIKey = Depends(verify_admin_api_key)
+    api_key: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """Activate a user (does not reactivate API keys)"""
     user = get_user(db, user_id)
@@ -212,7 +227,7 @@ async def activate_user(
 async def create_new_api_key(
     api_key_data: APIKeyCreate,
     db: Session = Depends(get_db),
-    admin_key: APIKey = Depends(verify_admin_api_key)
+    admin_key: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """Create a new API key"""
     try:
@@ -252,7 +267,7 @@ async def create_new_api_key(
 async def list_api_keys(
     show_inactive: bool = Query(False, description="Include inactive keys"),
     db: Session = Depends(get_db),
-    _: APIKey = Depends(verify_admin_api_key)
+    _: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """List all API keys"""
     from sqlmodel import select
@@ -280,7 +295,7 @@ async def list_api_keys(
 async def get_api_key_info(
     key_id: int,
     db: Session = Depends(get_db),
-    _: APIKey = Depends(verify_admin_api_key)
+    _: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """Get detailed information about an API key"""
     api_key = db.get(APIKey, key_id)
@@ -303,11 +318,11 @@ async def get_api_key_info(
         is_active=api_key.is_active
     )
 
-@router.post("/api-keys/{key_id}/deactivate")
+@router.post("/api-keys/{key_id}/deactivate", response_model=MessageResponse)
 async def deactivate_api_key(
     key_id: int,
     db: Session = Depends(get_db),
-    admin_key: APIKey = Depends(verify_admin_api_key)
+    admin_key: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """Deactivate an API key"""
     api_key = db.get(APIKey, key_id)
@@ -319,6 +334,7 @@ async def deactivate_api_key(
     
     api_key.is_active = False
     db.commit()
+    invalidate_api_key_cache(key_id=key_id)
     
     audit_log(
         action=AuditAction.API_KEY_DEACTIVATED,
@@ -328,11 +344,11 @@ async def deactivate_api_key(
     
     return {"message": f"Successfully deactivated API key: {api_key.name}"}
 
-@router.post("/api-keys/{key_id}/reactivate")
+@router.post("/api-keys/{key_id}/reactivate", response_model=MessageResponse)
 async def reactivate_api_key(
     key_id: int,
     db: Session = Depends(get_db),
-    admin_key: APIKey = Depends(verify_admin_api_key)
+    admin_key: CachedAPIKey = Depends(verify_admin_api_key)
 ):
     """Reactivate an API key"""
     api_key = db.get(APIKey, key_id)
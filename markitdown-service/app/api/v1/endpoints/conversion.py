@@ -1,29 +1,35 @@
 from fastapi import APIRouter, UploadFile, File, status, Request, Depends, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union, NamedTuple, BinaryIO, AsyncIterator, Tuple
+from cachetools import TLRUCache
 from markitdown import MarkItDown
-import tempfile
-import os
+import io
+import hashlib
+import sys
 import logging
 import logging.config
-import requests
+import httpx
 import time
-from contextlib import contextmanager
-from app.core.security.api_key import get_api_key
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+from urllib.parse import urlsplit
+from app.core.security.api_key import CachedAPIKey, get_api_key
 from app.core.config.settings import settings
 from app.core.errors.handlers import handle_api_operation, DEFAULT_ERROR_MAP
-from app.core.errors.exceptions import FileProcessingError, ConversionError, ContentTypeError
+from app.core.errors.exceptions import FileProcessingError, ConversionError, ContentTypeError, ServiceBusyError
 from app.core.validation.validators import (
     validate_file_size,
+    validate_content_size,
     validate_file_extension,
     validate_content_type,
     validate_file_content,
-    validate_upload_file,
+    validate_upload_stream,
     validate_text_input
 )
 from app.core.rate_limiting.limiter import rate_limit, RateLimitExceeded
-from app.models.auth.api_key import APIKey  # Add this import
+from app.core.rate_limiting.concurrency import conversion_limiter
 
 # Initialize router
 router = APIRouter(tags=["conversion"])
@@ -52,14 +58,16 @@ async def validate_text_request(request: Request, text_input: TextInput, **kwarg
     )
 
 async def validate_file_request(request: Request, file: UploadFile, **kwargs):
-    """Pre-validator for file conversion"""
-    return await validate_upload_file(file=file)
+    """Pre-validator for file conversion, keeps the validated upload for the endpoint"""
+    request.state.validated_upload = await validate_upload_stream(file=file)
 
-async def validate_url_request(response: requests.Response, **kwargs):
-    """Validator for URL response"""
+async def validate_url_request(response: httpx.Response, **kwargs):
+    """Validator for URL response, checks the headers before the body is read"""
     content_type = response.headers.get('content-type', '')
     validate_content_type(content_type)
-    validate_file_size(response.content)
+    content_length = response.headers.get('content-length', '')
+    if content_length.isdigit():
+        validate_content_size(int(content_length))
 
 def log_conversion_attempt(
     conversion_type: str,
@@ -117,39 +125,122 @@ def log_conversion_result(
     else:
         logger.error(f"{conversion_type} conversion failed", extra=log_data)
 
-@contextmanager
-def save_temp_file(content: bytes, suffix: str) -> str:
-    """Save content to a temporary file and return the file path."""
-    temp_file_path = None
-    try:
-        with tempfile.NamedTemporaryFile(suffix=suffix, mode='w+b', delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(content)
-            temp_file.flush()
-            logger.debug(
-                "Temporary file created",
-                extra={
-                    "path": temp_file.name,
-                    "size": len(content)
-                }
-            )
-            yield temp_file.name
-    finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-                logger.debug(f"Temporary file removed: {temp_file_path}")
-            except Exception as e:
-                logger.warning(
-                    "Failed to remove temporary file",
-                    extra={
-                        "path": temp_file_path,
-                        "error": str(e)
-                    }
-                )
-
-def process_conversion(file_path: str, ext: str, url: Optional[str] = None, content_type: str = None) -> str:
-    """Process conversion using MarkItDown and clean the markdown content."""
+def create_http_client() -> httpx.AsyncClient:
+    """Create the client used to fetch URLs for conversion."""
+    return httpx.AsyncClient(
+        headers={
+            'User-Agent': settings.USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5'
+        },
+        timeout=settings.REQUEST_TIMEOUT,
+        follow_redirects=True
+    )
+
+@asynccontextmanager
+async def stream_url(
+    request: Request,
+    url: str,
+    headers: Optional[Dict[str, str]] = None
+) -> AsyncIterator[httpx.Response]:
+    """
+    Request a URL without blocking the event loop or reading the body.
+
+    Uses the client opened in the application lifespan, or a short-lived one
+    when the lifespan has not run.
+    """
+    client = getattr(request.app.state, "http_client", None)
+    if client is not None:
+        async with client.stream("GET", url, headers=headers) as response:
+            yield response
+        return
+    async with create_http_client() as client:
+        async with client.stream("GET", url, headers=headers) as response:
+            yield response
+
+async def read_url_body(response: httpx.Response) -> io.BytesIO:
+    """
+    Read a streamed response body, giving up as soon as it exceeds MAX_FILE_SIZE.
+
+    Content-Length is already checked by validate_url_request, but it may be
+    missing or describe the compressed body, so the bytes read are counted too.
+    """
+    body = io.BytesIO()
+    async for chunk in response.aiter_bytes():
+        validate_content_size(body.tell() + len(chunk))
+        body.write(chunk)
+    if not body.tell():
+        raise ConversionError("Input file is empty or does not exist")
+    body.seek(0)
+    return body
+
+class CachedConversion(NamedTuple):
+    """Converted markdown, with the validators to revalidate a URL it came from."""
+    markdown: str
+    validators: Dict[str, str]
+
+def cached_size(value: CachedConversion) -> int:
+    """Memory held by a cached conversion, which its markdown dominates."""
+    return sys.getsizeof(value.markdown)
+
+def cache_expiry(key: Tuple, value: CachedConversion, now: float) -> float:
+    """Expiry time of a cache entry, URL and content entries have their own TTL."""
+    return now + (settings.URL_CACHE_TTL if key[0] == "url" else settings.CONTENT_CACHE_TTL)
+
+# Converted markdown within a memory budget, indexed by ("url", url) or
+# content_cache_key(). Only touched from the event loop, so no lock
+_conversion_cache: TLRUCache = TLRUCache(
+    maxsize=settings.CONVERSION_CACHE_MAX_BYTES,
+    ttu=cache_expiry,
+    getsizeof=cached_size
+)
+
+def cache_conversion(key: Tuple, value: CachedConversion) -> None:
+    """Cache a conversion, unless it's too large to be worth a share of the budget."""
+    if cached_size(value) <= settings.CONVERSION_CACHE_MAX_ITEM_BYTES:
+        _conversion_cache[key] = value
+    else:
+        _conversion_cache.pop(key, None)
+
+def get_cache_validators(response: httpx.Response) -> Dict[str, str]:
+    """Build conditional request headers from a response's ETag and Last-Modified."""
+    validators = {}
+    if etag := response.headers.get('etag'):
+        validators['If-None-Match'] = etag
+    if last_modified := response.headers.get('last-modified'):
+        validators['If-Modified-Since'] = last_modified
+    return validators
+
+@lru_cache()
+def get_converter() -> MarkItDown:
+    """
+    Create the cached MarkItDown converter.
+
+    Construction registers every converter and loads the file type detection
+    model; convert() only reads that state, so one instance serves all requests.
+    """
+    return MarkItDown()
+
+def is_wikipedia_url(url: str) -> bool:
+    """Check whether a URL is hosted on wikipedia.org or one of its language subdomains."""
+    hostname = urlsplit(url).hostname or ''
+    return hostname == 'wikipedia.org' or hostname.endswith('.wikipedia.org')
+
+def process_conversion(
+    source: Union[bytes, BinaryIO],
+    ext: str,
+    url: Optional[str] = None,
+    content_type: str = None
+) -> str:
+    """
+    Process conversion using MarkItDown and clean the markdown content.
+
+    Args:
+        source: Content already held in memory, or a validated stream of it
+        ext: File extension used to pick the converter
+        url: Optional source URL of the content
+        content_type: Optional content type for logging
+    """
     start_time = time.time()
     conversion_metadata = {
         "file_extension": ext,
@@ -158,19 +249,22 @@ def process_conversion(file_path: str, ext: str, url: Optional[str] = None, cont
     }
 
     try:
-        converter = MarkItDown()
+        converter = get_converter()
         
-        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-            raise ConversionError("Input file is empty or does not exist")
+        if isinstance(source, bytes):
+            if not source:
+                raise ConversionError("Input file is empty or does not exist")
+            # Content held in memory is converted as a stream, no temp file needed
+            source = io.BytesIO(source)
             
-        if url and "wikipedia.org" in url:
+        if url and is_wikipedia_url(url):
             logger.debug("Using WikipediaConverter for Wikipedia URL")
-            result = converter.convert(file_path, file_extension=ext, url=url, converter_type='wikipedia')
+            result = converter.convert(source, file_extension=ext, url=url, converter_type='wikipedia')
         else:
             if ext.lower() == '.html':
-                result = converter.convert(file_path, file_extension=ext, converter_type='html')
+                result = converter.convert(source, file_extension=ext, converter_type='html')
             else:
-                result = converter.convert(file_path, file_extension=ext, url=url)
+                result = converter.convert(source, file_extension=ext, url=url)
             
         if not result or not result.text_content:
             raise ConversionError("Conversion resulted in empty content")
@@ -194,6 +288,58 @@ def process_conversion(file_path: str, ext: str, url: Optional[str] = None, cont
         )
         raise ConversionError(f"Failed to convert content: {str(e)}")
 
+def content_cache_key(
+    source: Union[bytes, BinaryIO],
+    ext: str,
+    url: Optional[str] = None
+) -> Tuple[str, bytes, str, Optional[str]]:
+    """
+    Build the content cache key of a conversion.
+
+    The key covers everything that picks the converter: the content hash,
+    the extension and, for Wikipedia, the URL. Streams are rewound after hashing.
+    Hashing reads the whole content, so this blocks; run it in the thread pool.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(source, bytes):
+        digest.update(source)
+    else:
+        for chunk in iter(partial(source.read, 1 << 16), b''):
+            digest.update(chunk)
+        source.seek(0)
+    return "content", digest.digest(), ext.lower(), url if url and is_wikipedia_url(url) else None
+
+async def run_conversion(
+    source: Union[bytes, BinaryIO],
+    ext: str,
+    url: Optional[str] = None,
+    content_type: str = None
+) -> str:
+    """
+    Convert content in the thread pool, reusing the markdown of identical content converted before.
+
+    Only conversions that miss the cache take a slot of the conversion concurrency limit.
+
+    Raises:
+        ServiceBusyError: If too many conversions are already in progress
+    """
+    key = await run_in_threadpool(content_cache_key, source, ext, url)
+    cached = _conversion_cache.get(key)
+    if cached is not None:
+        logger.debug("Serving cached conversion", extra={"file_extension": ext, "url": url})
+        return cached.markdown
+
+    async with conversion_limiter.acquire():
+        markdown_content = await run_in_threadpool(
+            process_conversion,
+            source,
+            ext,
+            url=url,
+            content_type=content_type
+        )
+    cache_conversion(key, CachedConversion(markdown_content, {}))
+    return markdown_content
+
 @router.post(
     "/convert/text",
     response_class=PlainTextResponse
@@ -205,6 +351,7 @@ def process_conversion(file_path: str, ext: str, url: Optional[str] = None, cont
         FileProcessingError: (status.HTTP_400_BAD_REQUEST, None),
         ConversionError: (status.HTTP_422_UNPROCESSABLE_ENTITY, None),
         RateLimitExceeded: (status.HTTP_429_TOO_MANY_REQUESTS, None),
+        ServiceBusyError: (status.HTTP_503_SERVICE_UNAVAILABLE, None),
         **DEFAULT_ERROR_MAP
     }
 )
@@ -212,7 +359,7 @@ async def convert_text(
     request: Request,
     response: Response,
     text_input: TextInput,
-    api_key: APIKey = Depends(get_api_key)
+    api_key: Optional[CachedAPIKey] = Depends(get_api_key)
 ):
     """Convert text or HTML to markdown."""
     # Apply rate limiting
@@ -230,9 +377,11 @@ async def convert_text(
         str(api_key.id) if api_key else None
     )
     
-    with save_temp_file(text_input.content.encode('utf-8'), suffix='.html') as temp_file_path:
-        markdown_content = process_conversion(temp_file_path, '.html')
-        return PlainTextResponse(content=markdown_content)
+    markdown_content = await run_conversion(
+        text_input.content.encode('utf-8'),
+        '.html'
+    )
+    return PlainTextResponse(content=markdown_content)
 
 @router.post(
     "/convert/file",
@@ -244,6 +393,7 @@ async def convert_text(
     error_map={
         ConversionError: (status.HTTP_422_UNPROCESSABLE_ENTITY, None),
         RateLimitExceeded: (status.HTTP_429_TOO_MANY_REQUESTS, None),
+        ServiceBusyError: (status.HTTP_503_SERVICE_UNAVAILABLE, None),
         **DEFAULT_ERROR_MAP
     }
 )
@@ -251,38 +401,40 @@ async def convert_file(
     request: Request,
     response: Response,  # Add response parameter
     file: UploadFile = File(...),
-    api_key: APIKey = Depends(get_api_key)
+    api_key: Optional[CachedAPIKey] = Depends(get_api_key)
 ) -> PlainTextResponse:
     """Convert an uploaded file to markdown."""
-    # Apply rate limiting
-    await rate_limit(
-        rate=settings.RATE_LIMITS["/api/v1/convert/file"]["rate"],
-        per=settings.RATE_LIMITS["/api/v1/convert/file"]["per"]
-    )(request, response)
-
-    ext, content = await validate_upload_file(file=file)
-    
-    log_conversion_attempt(
-        "file",
-        {
-            "filename": file.filename,
-            "content_type": file.content_type,
-            "extension": ext,
-        },
-        str(api_key.id) if api_key else None
-    )
+    # Reuse the stream opened by validate_file_request rather than validating the upload again
+    ext, stream = getattr(request.state, "validated_upload", None) or await validate_upload_stream(file=file)
     
-    with save_temp_file(content, suffix=ext) as temp_file_path:
-        markdown_content = process_conversion(
-            temp_file_path,
-            ext,
-            content_type=file.content_type
+    with stream:
+        # Apply rate limiting
+        await rate_limit(
+            rate=settings.RATE_LIMITS["/api/v1/convert/file"]["rate"],
+            per=settings.RATE_LIMITS["/api/v1/convert/file"]["per"]
+        )(request, response)
+
+        log_conversion_attempt(
+            "file",
+            {
+                "filename": file.filename,
+                "content_type": file.content_type,
+                "extension": ext,
+            },
+            str(api_key.id) if api_key else None
         )
         
-        return PlainTextResponse(
-            content=markdown_content,
-            status_code=status.HTTP_200_OK
+        # Convert straight from the spooled upload, never holding it all in memory
+        markdown_content = await run_conversion(
+            stream,
+            ext,
+            content_type=file.content_type
         )
+    
+    return PlainTextResponse(
+        content=markdown_content,
+        status_code=status.HTTP_200_OK
+    )
 
 @router.post(
     "/convert/url",
@@ -291,20 +443,21 @@ async def convert_file(
 @handle_api_operation(
     "convert_url",
     error_map={
-        requests.ConnectionError: (status.HTTP_502_BAD_GATEWAY, None),
-        requests.Timeout: (status.HTTP_502_BAD_GATEWAY, None),
-        requests.RequestException: (status.HTTP_502_BAD_GATEWAY, None),
+        httpx.ConnectError: (status.HTTP_502_BAD_GATEWAY, None),
+        httpx.TimeoutException: (status.HTTP_502_BAD_GATEWAY, None),
+        httpx.HTTPError: (status.HTTP_502_BAD_GATEWAY, None),
         ContentTypeError: (status.HTTP_422_UNPROCESSABLE_ENTITY, None),
         ConversionError: (status.HTTP_422_UNPROCESSABLE_ENTITY, None),
         FileProcessingError: (status.HTTP_400_BAD_REQUEST, None),
         RateLimitExceeded: (status.HTTP_429_TOO_MANY_REQUESTS, None),
+        ServiceBusyError: (status.HTTP_503_SERVICE_UNAVAILABLE, None),
     }
 )
 async def convert_url(
     request: Request,
     response: Response,  # Add response parameter
     url_input: UrlInput,
-    api_key: APIKey = Depends(get_api_key)
+    api_key: Optional[CachedAPIKey] = Depends(get_api_key)
 ) -> PlainTextResponse:
     """Fetch a URL and convert its content to markdown."""
     # Apply rate limiting
@@ -322,28 +475,38 @@ async def convert_url(
         str(api_key.id) if api_key else None
     )
 
-    response = requests.get(
-        str(url_input.url),
-        headers={
-            'User-Agent': settings.USER_AGENT,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5'
-        },
-        timeout=settings.REQUEST_TIMEOUT,
-        allow_redirects=True
-    )
-    response.raise_for_status()
-    
-    await validate_url_request(response)
+    url = str(url_input.url)
+    cache_key = ("url", url)
+    cached = _conversion_cache.get(cache_key)
+    async with stream_url(request, url, headers=cached.validators if cached else None) as url_response:
+        # Unchanged since the last conversion, reuse the cached markdown
+        if cached is not None and url_response.status_code == status.HTTP_304_NOT_MODIFIED:
+            logger.debug("Serving cached conversion", extra={"url": url})
+            return PlainTextResponse(
+                content=cached.markdown,
+                status_code=status.HTTP_200_OK
+            )
 
-    with save_temp_file(response.content, suffix='.html') as temp_file_path:
-        markdown_content = process_conversion(
-            temp_file_path,
-            '.html',
-            url=str(url_input.url)
-        )
+        url_response.raise_for_status()
         
-        return PlainTextResponse(
-            content=markdown_content,
-            status_code=status.HTTP_200_OK
-        )
+        # Reject oversized or unsupported content before downloading it
+        await validate_url_request(url_response)
+        body = await read_url_body(url_response)
+
+    markdown_content = await run_conversion(
+        body,
+        '.html',
+        url=url
+    )
+
+    # Only responses that can be revalidated are cached
+    validators = get_cache_validators(url_response)
+    if validators:
+        cache_conversion(cache_key, CachedConversion(markdown_content, validators))
+    else:
+        _conversion_cache.pop(cache_key, None)
+    
+    return PlainTextResponse(
+        content=markdown_content,
+        status_code=status.HTTP_200_OK
+    )
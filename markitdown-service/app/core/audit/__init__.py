@@ -1,4 +1,4 @@
 from .actions import AuditAction
-from .audit import audit_log
+from .audit import audit_log, flush_audit_log
 
-__all__ = ["AuditAction", "audit_log"]
\ No newline at end of file
+__all__ = ["AuditAction", "audit_log", "flush_audit_log"]
\ No newline at end of file
@@ -1,8 +1,10 @@
+import atexit
 import logging
+import queue
 from datetime import datetime, UTC
 from typing import Optional, Any, Dict, Union
 from pathlib import Path
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
 from app.core.config.settings import settings
 from app.core.logging.formatters import AuditFormatter
 
@@ -13,9 +15,58 @@ Path(settings.LOG_DIR).mkdir(exist_ok=True)
 audit_logger = logging.getLogger("audit")
 audit_logger.setLevel(logging.INFO)  # Audit logs should always be at INFO level
 
+class AuditQueueHandler(QueueHandler):
+    """
+    Queue handler that passes records on unchanged.
+
+    The default prepare() formats the record into a string, but AuditFormatter
+    needs the original dict message. The queue never leaves the process, so
+    the record doesn't need to be made picklable either.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class AuditFileHandler(TimedRotatingFileHandler):
+    """
+    Rotating file handler that doesn't flush after every record.
+
+    Records stay in the stream's buffer until AuditQueueListener flushes it,
+    so a burst of audit records costs a few writes instead of one per record.
+    """
+    _emitting = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._emitting = True
+        try:
+            super().emit(record)
+        finally:
+            self._emitting = False
+
+    def flush(self) -> None:
+        # StreamHandler.emit flushes after each record, skip that one
+        if not self._emitting:
+            super().flush()
+
+class AuditQueueListener(QueueListener):
+    """Queue listener that flushes its handlers whenever the queue runs empty"""
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if block and self.queue.empty():
+            self.flush()
+        return super().dequeue(block)
+
+    def flush(self) -> None:
+        for handler in self.handlers:
+            handler.flush()
+
+    def stop(self) -> None:
+        super().stop()
+        self.flush()
+
+audit_listener: Optional[AuditQueueListener] = None
+
 if settings.AUDIT_LOG_ENABLED and not audit_logger.handlers:
     # Create audit log handler with rotation
-    audit_handler = TimedRotatingFileHandler(
+    audit_handler = AuditFileHandler(
         filename=settings.AUDIT_LOG_FILE,
         when='midnight',
         interval=1,
@@ -26,11 +77,28 @@ if settings.AUDIT_LOG_ENABLED and not audit_logger.handlers:
     # Use the centralized AuditFormatter
     formatter = AuditFormatter()
     audit_handler.setFormatter(formatter)
-    audit_logger.addHandler(audit_handler)
+
+    # Callers only enqueue the record, the file is written from the
+    # listener's thread so audit logging never blocks a request
+    audit_listener = AuditQueueListener(queue.SimpleQueue(), audit_handler)
+    audit_listener.start()
+    atexit.register(audit_listener.stop)
+    audit_logger.addHandler(AuditQueueHandler(audit_listener.queue))
 
     # Prevent audit logs from propagating to root logger
     audit_logger.propagate = False
 
+def flush_audit_log() -> None:
+    """
+    Wait until every queued audit record has been written.
+
+    Stopping the listener drains the queue, it's restarted right away so
+    records logged afterwards are still written.
+    """
+    if audit_listener is not None:
+        audit_listener.stop()
+        audit_listener.start()
+
 def audit_log(
     action: str,
     user_id: Optional[str],
@@ -52,14 +120,12 @@ def audit_log(
         return
 
     try:
-        # Create the audit log entry
+        # Create the audit log entry. AuditFormatter adds the timestamp from
+        # the record, as well as service and environment
         audit_entry = {
             "action": action,
             "user_id": user_id,
-            "status": status,
-            "timestamp": datetime.now(UTC).isoformat(),
-            "service": settings.PROJECT_NAME,
-            "version": settings.VERSION
+            "status": status
         }
 
         # Handle details based on type
@@ -72,13 +138,6 @@ def audit_log(
         if extra:
             audit_entry["extra"] = extra
 
-        # Add environment context
-        audit_entry["context"] = {
-            "environment": settings.ENVIRONMENT,
-            "version": settings.VERSION,
-            "component": "audit"
-        }
-
         # Log at appropriate level based on status
         log_level = logging.WARNING if status == "failure" else logging.INFO
         
@@ -103,4 +162,4 @@ def audit_log(
             }
         )
 
-__all__ = ["audit_log"]
\ No newline at end of file
+__all__ = ["audit_log", "flush_audit_log"]
\ No newline at end of file
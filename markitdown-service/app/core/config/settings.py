@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from pydantic import ConfigDict, EmailStr
+from pydantic import ConfigDict, EmailStr, model_validator
 from typing import List, Optional, Dict, Any
 import os
 from functools import lru_cache
@@ -41,6 +41,13 @@ class Settings(BaseSettings):
     
     # File Processing Settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB default
+    CONVERSION_THREAD_LIMIT: int = 100  # worker threads shared by conversions and other sync work
+    CONVERSION_CONCURRENCY_INITIAL: int = 8  # concurrent conversions at startup
+    CONVERSION_CONCURRENCY_MIN: int = 2
+    CONVERSION_CONCURRENCY_MAX: int = 64
+    CONVERSION_LATENCY_TARGET: float = 5.0  # seconds, for the p95 of a window
+    CONVERSION_LATENCY_WINDOW: float = 10.0  # seconds between limit adjustments
+    CONVERSION_QUEUE_TIMEOUT: float = 1.0  # seconds to wait for a slot before rejecting
     SUPPORTED_EXTENSIONS: List[str] = [
         '.pdf', '.docx', '.pptx', '.xlsx', '.wav', '.mp3',
         '.jpg', '.jpeg', '.png', '.html', '.htm', '.txt', '.csv', '.json', '.xml'
@@ -53,11 +60,18 @@ class Settings(BaseSettings):
         'AppleWebKit/537.36 (KHTML, like Gecko) '
         'Chrome/91.0.4472.124 Safari/537.36'
     )
+    CONVERSION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # memory shared by cached conversions
+    CONVERSION_CACHE_MAX_ITEM_BYTES: int = 2 * 1024 * 1024  # larger conversions aren't cached
+    URL_CACHE_TTL: int = 300  # seconds
+    CONTENT_CACHE_TTL: int = 3600  # seconds
+    HEALTH_CHECK_CACHE_TTL: float = 2.0  # seconds a healthy probe result is reused
 
     # Rate Limiting Settings
     RATE_LIMITING_ENABLED: bool = True
     RATE_LIMIT_DEFAULT_RATE: int = 30  # requests
     RATE_LIMIT_DEFAULT_PERIOD: int = 60  # seconds
+    RATE_LIMIT_MAX_KEYS: int = 200_000  # tracked clients
+    RATE_LIMIT_SWEEP_INTERVAL: int = 60  # seconds
     
     # Test-specific rate limiting settings
     TEST_RATE_LIMIT_DEFAULT_RATE: int = 5  # requests
@@ -67,10 +81,11 @@ class Settings(BaseSettings):
     RATE_LIMITS: Dict[str, Dict[str, int]] = {
         "/api/v1/convert/url": {"rate": 60, "per": 60},
         "/api/v1/convert/file": {"rate": 60, "per": 60},
-        "/api/v1/convert/text": {"rate": 60, "per": 60}
+        "/api/v1/convert/text": {"rate": 60, "per": 60},
+        "/public/api/v1/convert/file": {"rate": 60, "per": 60}
     }
 
-    # Endpoints excluded from rate limiting
+    # Endpoints excluded from rate limiting, matched as plain path prefixes
     RATE_LIMIT_EXCLUDED_ENDPOINTS: List[str] = [
         "/api/v1/admin/*"
     ]
@@ -88,6 +103,7 @@ class Settings(BaseSettings):
     DATABASE_CONNECT_ARGS: dict = {"check_same_thread": False}
     DATABASE_POOL_SIZE: int = 5
     DATABASE_POOL_RECYCLE: int = 3600
+    DATABASE_POOL_PRE_PING: bool = True
     DATABASE_ECHO: bool = ENVIRONMENT == "development"
 
     # API Key Authentication Settings
@@ -95,7 +111,17 @@ class Settings(BaseSettings):
     API_KEY_HEADER_NAME: str = "X-API-Key"
     API_KEY_LENGTH: int = 32
     ADMIN_API_KEY: Optional[str] = os.getenv("ADMIN_API_KEY")
+    # Secret mixed into stored API key digests; changing it invalidates all keys.
+    # Kept apart from SECRET_KEY so that one can be rotated, and required
+    # outside development and test
+    API_KEY_PEPPER: Optional[str] = os.getenv("API_KEY_PEPPER")
     API_KEY_EXPIRATION_DAYS: Optional[int] = None
+    # Verified keys are cached in-process; changes made outside this process
+    # (e.g. via the CLI) take effect once the cached entry expires
+    API_KEY_CACHE_SIZE: int = 10_000
+    API_KEY_CACHE_TTL: int = 60  # seconds
+    # last_used timestamps are buffered and written in batches
+    API_KEY_LAST_USED_FLUSH_INTERVAL: int = 30  # seconds
 
     # Initial Setup Settings
     INITIAL_ADMIN_NAME: str = os.getenv("INITIAL_ADMIN_NAME", "System Admin")
@@ -130,6 +156,8 @@ class Settings(BaseSettings):
     LOG_ROTATION_MAX_SIZE: str = "100M"  # Rotate when file exceeds this size
     LOG_COMPRESSION_ENABLED: bool = True
     LOG_COMPRESSION_METHOD: str = "gzip"
+    LOG_COMPRESSION_LEVEL: int = 1  # Fastest; logs compress well at any level
+    LOG_COPY_BUFFER_SIZE: int = 1024 * 1024  # bytes
     
     # Environment-specific retention multipliers
     LOG_RETENTION_MULTIPLIERS: Dict[str, float] = {
@@ -170,6 +198,15 @@ class Settings(BaseSettings):
     CLI_COLORS: bool = True
     CLI_TABLE_STYLE: str = "rounded"
 
+    @model_validator(mode="after")
+    def check_api_key_pepper(self) -> "Settings":
+        """Refuse to start without an API key pepper, except in development and test"""
+        if not self.API_KEY_PEPPER:
+            if self.ENVIRONMENT not in ("development", "test"):
+                raise ValueError(f"API_KEY_PEPPER must be set in the {self.ENVIRONMENT} environment")
+            self.API_KEY_PEPPER = f"{self.ENVIRONMENT}-api-key-pepper"
+        return self
+
     @property
     def get_log_level(self) -> int:
         """Get the numeric log level, with environment-specific defaults"""
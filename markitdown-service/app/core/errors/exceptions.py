@@ -16,4 +16,10 @@ class ContentTypeError(ConversionError):
     def __init__(self, content_type: str):
         super().__init__(f"Unsupported content type: {content_type}")
 
-__all__ = ["FileProcessingError", "ConversionError", "ContentTypeError"]
\ No newline at end of file
+class ServiceBusyError(OperationError):
+    """Raised when the service is too busy to take on more work"""
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.headers = {"Retry-After": str(retry_after)}
+
+__all__ = ["FileProcessingError", "ConversionError", "ContentTypeError", "ServiceBusyError"]
\ No newline at end of file
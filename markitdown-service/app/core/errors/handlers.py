@@ -3,11 +3,12 @@ from functools import wraps
 from typing import Callable, Type, Optional, Dict, Tuple, List
 from fastapi import HTTPException, status, Request
 import requests
+import httpx
 import logging
 from app.core.audit import audit_log, AuditAction
 import time
 from app.core.errors.base import OperationError
-from app.core.errors.exceptions import FileProcessingError, ConversionError
+from app.core.errors.exceptions import FileProcessingError, ConversionError, ServiceBusyError
 from app.core.rate_limiting.limiter import RateLimitExceeded
 from sqlalchemy.exc import SQLAlchemyError
 import inspect
@@ -21,7 +22,9 @@ DEFAULT_ERROR_MAP = {
     requests.ConnectionError: (status.HTTP_502_BAD_GATEWAY, None),
     requests.Timeout: (status.HTTP_502_BAD_GATEWAY, None),
     requests.RequestException: (status.HTTP_502_BAD_GATEWAY, None),
+    httpx.HTTPError: (status.HTTP_502_BAD_GATEWAY, None),
     ConversionError: (status.HTTP_422_UNPROCESSABLE_ENTITY, None),
+    ServiceBusyError: (status.HTTP_503_SERVICE_UNAVAILABLE, None),
     OperationError: (status.HTTP_422_UNPROCESSABLE_ENTITY, None),
     RateLimitExceeded: (status.HTTP_429_TOO_MANY_REQUESTS, None),
     SQLAlchemyError: (status.HTTP_500_INTERNAL_SERVER_ERROR, "Database error occurred"),
@@ -218,7 +221,11 @@ def handle_api_operation(
                 if isinstance(actual_exception, HTTPException):
                     raise actual_exception
                 else:
-                    raise HTTPException(status_code=status_code, detail=detail)
+                    raise HTTPException(
+                        status_code=status_code,
+                        detail=detail,
+                        headers=getattr(actual_exception, "headers", None)
+                    )
                 
         return wrapper
     return decorator
@@ -44,47 +44,38 @@ class SafeRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
             dest_dir = os.path.dirname(dest)
             os.makedirs(dest_dir, exist_ok=True)
             
-            with open(source, 'a') as f:
+            # Lock the same sentinel file as LogManager.rotate_log
+            lock_path = f"{os.path.splitext(source)[0]}.rotate.lock"
+            with open(lock_path, 'a') as f:
                 try:
                     # Acquire exclusive lock
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                    fcntl.lockf(f, fcntl.LOCK_EX)
                     
-                    # Copy content and truncate source
-                    with open(source, 'rb') as sf:
-                        content = sf.read()
-                    
-                    # Write to new file with proper permissions
-                    with open(dest, 'wb') as df:
-                        os.chmod(dest, 0o644)  # Set permissions before writing
-                        df.write(content)
+                    # Compress the source straight into the rotated file,
+                    # without an uncompressed copy in between
+                    buffer_size = settings.LOG_COPY_BUFFER_SIZE
+                    gz_path = f"{dest}.gz"
+                    with open(source, 'rb', buffering=buffer_size) as f_in, \
+                            gzip.open(gz_path, 'wb', compresslevel=settings.LOG_COMPRESSION_LEVEL) as f_out:
+                        shutil.copyfileobj(f_in, f_out, buffer_size)
+                    os.chmod(gz_path, 0o644)  # Set permissions for compressed file
                     
                     # Truncate source file
                     with open(source, 'w') as sf:
                         pass
                     
-                    # Compress the rotated file
-                    with open(dest, 'rb') as f_in:
-                        gz_path = f"{dest}.gz"
-                        with gzip.open(gz_path, 'wb') as f_out:
-                            shutil.copyfileobj(f_in, f_out)
-                        os.chmod(gz_path, 0o644)  # Set permissions for compressed file
-                    
-                    # Remove the uncompressed rotated file
-                    Path(dest).unlink()
-                    
                 finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                    fcntl.lockf(f, fcntl.LOCK_UN)
         except (IOError, OSError) as e:
             logger.error(f"Error rotating log file {source} to {dest}: {str(e)}")
             # Ensure we don't leave partial files
-            try:
-                if os.path.exists(dest):
-                    os.unlink(dest)
-                gz_path = f"{dest}.gz"
-                if os.path.exists(gz_path):
-                    os.unlink(gz_path)
-            except OSError as cleanup_error:
-                logger.error(f"Error cleaning up after failed rotation: {str(cleanup_error)}")
+            for partial_path in (dest, f"{dest}.gz"):
+                try:
+                    os.unlink(partial_path)
+                except FileNotFoundError:
+                    pass
+                except OSError as cleanup_error:
+                    logger.error(f"Error cleaning up after failed rotation: {str(cleanup_error)}")
 
 def get_file_handler(filename: str, formatter: str = "detailed") -> Dict[str, Any]:
     """Get a safe rotating file handler configuration."""
@@ -1,6 +1,6 @@
 import logging
-import json
-from datetime import datetime, UTC
+import time
+import orjson
 from app.core.config import settings
 
 class AuditFormatter(logging.Formatter):
@@ -8,12 +8,32 @@ class AuditFormatter(logging.Formatter):
     Custom formatter for audit logs that converts log records to structured JSON.
     Produces concise, non-redundant audit logs with essential fields.
     """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Fixed for the lifetime of the process, read once
+        self.environment = settings.ENVIRONMENT
+        self.service = settings.PROJECT_NAME
+        # (second, formatted second) of the last timestamp, kept as one tuple
+        # so concurrent formats never see a mismatched pair
+        self._timestamp_cache = None
+
+    def format_timestamp(self, created: float) -> str:
+        """Format a record's creation time as ISO 8601 UTC, reusing the date part within a second"""
+        seconds = int(created)
+        cached = self._timestamp_cache
+        if cached is None or cached[0] != seconds:
+            cached = self._timestamp_cache = (
+                seconds,
+                time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+            )
+        return f"{cached[1]}.{int((created - seconds) * 1e6):06d}+00:00"
+
     def format(self, record):
         # Base audit fields
         audit_dict = {
-            "timestamp": datetime.now(UTC).isoformat(),
+            "timestamp": self.format_timestamp(record.created),
             "level": record.levelname,
-            "environment": settings.ENVIRONMENT,
+            "environment": self.environment,
             "component": "audit"
         }
 
@@ -25,7 +45,7 @@ class AuditFormatter(logging.Formatter):
                 "action": msg_dict.get("action"),
                 "user_id": msg_dict.get("user_id"),
                 "status": msg_dict.get("status", "success"),
-                "service": msg_dict.get("service", settings.PROJECT_NAME),
+                "service": msg_dict.get("service", self.service),
             })
             
             # Add details if present
@@ -48,6 +68,8 @@ class AuditFormatter(logging.Formatter):
             "thread_name": record.threadName
         }
 
-        return json.dumps(audit_dict, default=str)
+        # Details come from all over the app, so allow non-string keys and
+        # fall back to str() for anything orjson can't serialize natively
+        return orjson.dumps(audit_dict, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
 
 __all__ = ["AuditFormatter"]
\ No newline at end of file
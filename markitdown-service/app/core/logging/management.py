@@ -29,73 +29,84 @@ class LogManager:
         )
         return int(base_days * multiplier)
 
+    def get_lock_path(self, name: str) -> Path:
+        """Get path of the sentinel file locked while a log is rotated."""
+        return self.log_dir / f"{name}.rotate.lock"
+
     def rotate_log(self, name: str) -> None:
         """Rotate a log file, compressing the old one."""
         current = self.get_log_path(name)
         if not current.exists():
             return
 
-        # Lock the file during rotation
-        with open(current, 'a') as f:
+        # Lock a sentinel file during rotation; POSIX record locks also
+        # hold across hosts sharing the log directory over NFS
+        with open(self.get_lock_path(name), 'a') as lock_file:
             try:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                fcntl.lockf(lock_file, fcntl.LOCK_EX)
 
                 # Check file size before rotating
-                if current.stat().st_size == 0:
+                if not current.exists() or current.stat().st_size == 0:
                     return
 
                 # Rotate
                 today = datetime.now()
                 rotated = self.get_log_path(name, today)
 
-                # Copy content and truncate original
-                shutil.copy2(current, rotated)
+                # Copy content, compressing it straight from the current
+                # log if enabled, and truncate original
+                if self.settings.LOG_COMPRESSION_ENABLED:
+                    buffer_size = self.settings.LOG_COPY_BUFFER_SIZE
+                    gz_path = str(rotated) + '.gz'
+                    with open(current, 'rb', buffering=buffer_size) as f_in, \
+                            gzip.open(gz_path, 'wb', compresslevel=self.settings.LOG_COMPRESSION_LEVEL) as f_out:
+                        shutil.copyfileobj(f_in, f_out, buffer_size)
+                else:
+                    shutil.copy2(current, rotated)
                 with open(current, 'w') as cf:
                     pass
 
-                # Compress rotated file if enabled
-                if self.settings.LOG_COMPRESSION_ENABLED:
-                    with open(rotated, 'rb') as f_in:
-                        gz_path = str(rotated) + '.gz'
-                        with gzip.open(gz_path, 'wb') as f_out:
-                            shutil.copyfileobj(f_in, f_out)
-                    rotated.unlink()
-
             finally:
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                fcntl.lockf(lock_file, fcntl.LOCK_UN)
 
     def cleanup_old_logs(self) -> None:
         """Remove log files older than retention period based on log type and environment."""
         now = datetime.now()
+        suffix = '.log.gz'
+        cutoffs = {}
 
-        for file in self.log_dir.glob('*.log.gz'):
-            try:
-                # Extract log type and date from filename
-                filename_parts = file.stem.split('_')
-                if len(filename_parts) < 2:
+        with os.scandir(self.log_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(suffix):
                     continue
 
-                log_type = filename_parts[0]
-                date_str = filename_parts[-1]
+                # Extract log type and date from filename, either
+                # {type}_{YYYY-MM-DD} from rotate_log or {type}_{env}-{YYYYMMDD}
+                # from SafeRotatingFileHandler
+                stem = entry.name[:-len(suffix)]
+                if stem[-11:-10] == '_' and stem[-6:-5] == '-':
+                    prefix, date_str = stem[:-11], stem[-10:]
+                elif stem[-9:-8] == '-':
+                    prefix, date_str = stem[:-9], f"{stem[-8:-4]}-{stem[-4:-2]}-{stem[-2:]}"
+                else:
+                    continue
+                if not prefix or not date_str.replace('-', '').isdigit():
+                    continue
 
-                # Get environment-adjusted retention period
-                retention_days = self.get_retention_days(log_type)
-                cutoff = now - timedelta(days=retention_days)
+                # Get environment-adjusted retention period; ISO dates
+                # compare the same as strings as they do as dates
+                log_type = prefix.split('_')[0]
+                cutoff = cutoffs.get(log_type)
+                if cutoff is None:
+                    retention_days = self.get_retention_days(log_type)
+                    cutoff = cutoffs[log_type] = (now - timedelta(days=retention_days)).strftime('%Y-%m-%d')
 
-                try:
-                    file_date = datetime.strptime(date_str, '%Y-%m-%d')
-                except ValueError:
-                    # Try alternate date format (for older logs)
+                if date_str < cutoff:
                     try:
-                        file_date = datetime.strptime(date_str.split('-')[0], '%Y%m%d')
-                    except ValueError:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
                         continue
 
-                if file_date < cutoff:
-                    file.unlink()
-            except (ValueError, IndexError):
-                continue
-
     def get_log_size(self, name: str) -> int:
         """Get the current size of a log file in bytes."""
         path = self.get_log_path(name)
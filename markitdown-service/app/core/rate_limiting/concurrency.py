@@ -0,0 +1,137 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional
+import asyncio
+import logging
+import math
+import time
+from app.core.config import settings
+from app.core.errors.exceptions import ServiceBusyError
+
+logger = logging.getLogger(__name__)
+
+class ConcurrencyLimiter:
+    """
+    Adaptive limit on concurrent conversions (AIMD).
+
+    Conversion durations are collected per latency window. When a window
+    ends, the limit grows additively if the window's p95 stayed within the
+    latency target and is halved if it didn't, so the limit changes at most
+    once per window no matter how many conversions finish in it.
+
+    Requests arriving while the limit is reached wait up to `queue_timeout`
+    for a slot, then are rejected rather than queueing up on the thread pool
+    behind conversions that are already slow.
+
+    The state is only touched from the event loop, so no lock is needed.
+    """
+
+    MAX_SAMPLES = 1024
+
+    def __init__(
+        self,
+        initial: int = settings.CONVERSION_CONCURRENCY_INITIAL,
+        minimum: int = settings.CONVERSION_CONCURRENCY_MIN,
+        maximum: int = settings.CONVERSION_CONCURRENCY_MAX,
+        latency_target: float = settings.CONVERSION_LATENCY_TARGET,
+        window: float = settings.CONVERSION_LATENCY_WINDOW,
+        queue_timeout: float = settings.CONVERSION_QUEUE_TIMEOUT,
+        increase: float = 1.0,
+        decrease: float = 0.5
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.window = window
+        self.queue_timeout = queue_timeout
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.samples: Deque[float] = deque(maxlen=self.MAX_SAMPLES)
+        self.window_end: Optional[float] = None
+        self.waiters: Deque[asyncio.Future] = deque()
+
+    def reset(self, initial: int = settings.CONVERSION_CONCURRENCY_INITIAL) -> None:
+        """Reset the limit and the current window, conversions in flight keep being counted"""
+        self.limit = float(initial)
+        self.samples.clear()
+        self.window_end = None
+
+    def record(self, duration: float, now: Optional[float] = None) -> None:
+        """Record the duration of a finished conversion, adjusting the limit once a window ends"""
+        now = time.monotonic() if now is None else now
+        if self.window_end is None:
+            self.window_end = now + self.window
+        self.samples.append(duration)
+        if now < self.window_end:
+            return
+
+        samples = sorted(self.samples)
+        p95 = samples[math.ceil(len(samples) * 0.95) - 1]
+        self.samples.clear()
+        self.window_end = now + self.window
+
+        if p95 <= self.latency_target:
+            self.limit = min(self.maximum, self.limit + self.increase)
+        else:
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            logger.warning(
+                "Conversion p95 exceeded latency target, lowering concurrency limit",
+                extra={"p95": p95, "limit": int(self.limit)}
+            )
+
+    def _wake_waiters(self) -> None:
+        """Wake as many waiting requests as there are free slots"""
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def _wait_for_slot(self) -> None:
+        """
+        Wait until a slot is free.
+
+        Raises:
+            ServiceBusyError: If no slot frees up within the queue timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        while self.in_flight >= int(self.limit):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise ServiceBusyError("Too many conversions in progress, please retry shortly")
+            waiter = loop.create_future()
+            self.waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if waiter in self.waiters:
+                    self.waiters.remove(waiter)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """
+        Hold a conversion slot for the duration of the block, timing it.
+
+        Raises:
+            ServiceBusyError: If no slot frees up within the queue timeout
+        """
+        if self.in_flight >= int(self.limit):
+            await self._wait_for_slot()
+        self.in_flight += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            now = time.monotonic()
+            self.record(now - start, now)
+            self._wake_waiters()
+
+# Global conversion limiter instance
+conversion_limiter = ConcurrencyLimiter()
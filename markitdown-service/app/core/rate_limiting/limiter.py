@@ -1,90 +1,207 @@
+from collections import OrderedDict
 from datetime import datetime, UTC
-from typing import Optional, Tuple, Dict, Any, Callable
+from typing import Optional, Tuple, Dict, Any, Callable, List
 from fastapi import Request, Response
+from functools import lru_cache
+import math
+import re
 import time
-from collections import defaultdict
 import threading
 from app.core.config import settings
 from app.core.audit import audit_log, AuditAction
+from app.core.security.api_key import get_cached_api_key
 import logging
 
 logger = logging.getLogger(__name__)
 
-class RateLimiter:
-    """Thread-safe in-memory rate limiter using fixed window algorithm"""
-    
+class _Bucket:
+    """Counter state of a single rate limit bucket"""
+    __slots__ = ("window_start", "current", "previous", "expires", "last_audit", "suppressed")
+
+    def __init__(self):
+        self.window_start = 0
+        self.current = 0
+        self.previous = 0
+        self.expires = 0
+        self.last_audit = 0
+        self.suppressed = 0
+
+class _Shard:
+    """Buckets of one rate limiter shard, guarded by their own lock"""
+    __slots__ = ("lock", "buckets", "next_sweep", "last_sweep", "full_logged")
+
     def __init__(self):
-        self.buckets: Dict[str, Dict[str, Any]] = defaultdict(
-            lambda: {"requests": 0, "window_start": 0}
-        )
         self.lock = threading.Lock()
+        # Least recently used bucket first
+        self.buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self.next_sweep = 0
+        self.last_sweep = 0
+        self.full_logged = False
+
+    def sweep(self, now: int) -> None:
+        """Drop buckets that no longer count against any limit. Caller must hold the lock."""
+        expired = [key for key, bucket in self.buckets.items() if bucket.expires <= now]
+        for key in expired:
+            del self.buckets[key]
+        self.last_sweep = now
+        self.full_logged = False
+
+class RateLimiter:
+    """
+    Thread-safe in-memory rate limiter using a sliding window approximation.
+
+    Each bucket keeps the request counts of the current and the previous
+    fixed window. The previous count is weighted by how much of it still
+    overlaps the sliding window, which avoids the 2x burst a plain fixed
+    window allows around window boundaries while using O(1) memory per key.
+
+    Buckets are spread over a fixed number of shards, each with its own lock,
+    so requests from unrelated clients never contend for the same lock.
+    Each shard periodically drops buckets whose windows have both expired
+    and is capped at its share of `max_keys`, so memory stays bounded even
+    when scanned from many addresses. A full shard is swept right away and,
+    if that frees nothing, evicts its least recently used bucket, so clients
+    rotating through addresses push out each other rather than the buckets
+    of clients that keep making requests.
+    """
+
+    SHARD_COUNT = 64
+    
+    def __init__(
+        self,
+        shard_count: int = SHARD_COUNT,
+        max_keys: int = settings.RATE_LIMIT_MAX_KEYS,
+        sweep_interval: int = settings.RATE_LIMIT_SWEEP_INTERVAL
+    ):
+        self.shards: List[_Shard] = [_Shard() for _ in range(shard_count)]
+        self.shard_count = shard_count
+        self.max_shard_keys = max(1, max_keys // shard_count)
+        self.sweep_interval = sweep_interval
 
     def reset(self):
         """Reset all rate limiting buckets"""
-        with self.lock:
-            self.buckets.clear()
+        # Shards are always visited in the same order, so this can't deadlock
+        for shard in self.shards:
+            with shard.lock:
+                shard.buckets.clear()
+                shard.next_sweep = 0
+
+    def _get_shard(self, bucket_key: str) -> _Shard:
+        """Get the shard a bucket key belongs to"""
+        return self.shards[hash(bucket_key) % self.shard_count]
     
     def _get_bucket_key(self, request: Request) -> str:
         """Get unique key for rate limit bucket based on API key or IP"""
-        api_key = getattr(request.state, "api_key", None)
+        # Read the request state and client straight from the ASGI scope;
+        # request.state raises and catches an AttributeError for the API key
+        # every time it's not set, which is always the case in the middleware
+        scope = request.scope
+        state = scope.get("state")
+        api_key = state.get("api_key") if state else None
         if api_key:
             return f"key_{api_key.id}"
-        return f"ip_{request.client.host}"
+        # Before authentication, count a recently verified key against its own
+        # bucket, so keys behind one NAT or proxy don't share a bucket. Unknown
+        # keys fall back to the address, so made-up keys can't dodge the limit
+        if settings.API_KEY_AUTH_ENABLED:
+            cached = get_cached_api_key(request)
+            if cached:
+                return f"key_{cached.id}"
+        client = scope.get("client")
+        return f"ip_{client[0] if client else None}"
 
     def check_rate_limit(
         self, 
         request: Request,
-        response: Response,
+        response: Optional[Response],
         rate: int = 30,
-        per: int = 60
+        per: int = 60,
+        now: Optional[float] = None,
+        bucket_key: Optional[str] = None
     ) -> Tuple[bool, Dict[str, Any]]:
         """
         Check if request should be rate limited.
         
         Args:
             request: FastAPI request
-            response: FastAPI response
+            response: FastAPI response, unused and may be None
             rate: Number of allowed requests
             per: Time period in seconds
+            now: Request time as a Unix timestamp, defaults to the current time
+            bucket_key: Bucket to count the request in, defaults to the client's
             
         Returns:
             Tuple[bool, Dict[str, Any]]: (is_allowed, limit_info)
         """
-        bucket_key = self._get_bucket_key(request)
-        now = int(time.time())
+        bucket_key = bucket_key or self._get_bucket_key(request)
+        now = int(time.time() if now is None else now)
+        shard = self._get_shard(bucket_key)
         
-        with self.lock:
-            bucket = self.buckets[bucket_key]
-            
-            # Check if we're in a new time window
-            if now - bucket["window_start"] >= per:
-                bucket["requests"] = 0
-                bucket["window_start"] = now
-            
-            # Calculate time left in the current window
-            time_passed = now - bucket["window_start"]
-            time_left = max(0, per - time_passed)
-            reset_time = bucket["window_start"] + per
+        window_start = now - now % per
+        elapsed = now - window_start
+        
+        with shard.lock:
+            if now >= shard.next_sweep:
+                shard.sweep(now)
+                shard.next_sweep = now + self.sweep_interval
             
-            # Check if we've exceeded the rate limit
-            if bucket["requests"] >= rate:
-                is_allowed = False
-                remaining = 0
+            buckets = shard.buckets
+            bucket = buckets.get(bucket_key)
+            if bucket is None:
+                if len(buckets) >= self.max_shard_keys:
+                    self._make_room(shard, now)
+                bucket = buckets[bucket_key] = _Bucket()
             else:
-                is_allowed = True
-                bucket["requests"] += 1
-                remaining = rate - bucket["requests"]
+                buckets.move_to_end(bucket_key)
             
-            # Prepare rate limit info
-            limit_info = {
-                "limit": rate,
-                "remaining": remaining,
-                "reset": reset_time,
-                "key": bucket_key,
-                "retry_after": time_left
-            }
+            # Roll over into a new window; the previous count only carries
+            # over if the windows are adjacent
+            if bucket.window_start != window_start:
+                bucket.previous = bucket.current if window_start - bucket.window_start == per else 0
+                bucket.current = 0
+                bucket.window_start = window_start
+                # Once the next window has passed as well, neither count matters
+                bucket.expires = window_start + 2 * per
+            previous, current = bucket.previous, bucket.current
+            
+            # Estimate the requests made within the last `per` seconds;
+            # without a previous window this is just the current count
+            estimated = previous * (per - elapsed) / per + current if previous else current
             
-            # Log rate limit check
+            # Check if we've exceeded the rate limit
+            is_allowed = estimated < rate
+            if is_allowed:
+                bucket.current = current + 1
+        
+        # Calculate time until the current window ends, or for rejected
+        # requests, until the estimate drops back below the rate
+        reset_time = window_start + per
+        time_left = per - elapsed
+        if is_allowed:
+            remaining = max(0, int(rate - estimated - 1))
+        else:
+            remaining = 0
+            if current < rate:
+                # Wait for enough of the previous window to slide out
+                time_left = math.floor(per - (rate - current) * per / previous) + 1 - elapsed
+            elif current:
+                # Wait for the next window and enough of this one to slide out
+                time_left += math.floor(per - rate * per / current) + 1
+            time_left = max(1, time_left)
+        
+        # Prepare rate limit info
+        limit_info = {
+            "limit": rate,
+            "per": per,
+            "remaining": remaining,
+            "reset": reset_time,
+            "key": bucket_key,
+            "retry_after": time_left
+        }
+        
+        # Log rate limit check, skipping the message and extra dict unless
+        # debug logging is actually on
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug(
                 f"Rate limit check: {bucket_key}",
                 extra={
@@ -94,8 +211,48 @@ class RateLimiter:
                     "path": request.url.path
                 }
             )
-            
-            return is_allowed, limit_info
+        
+        return is_allowed, limit_info
+
+    def _make_room(self, shard: _Shard, now: int) -> None:
+        """Free a slot in a full shard. Caller must hold the shard's lock."""
+        # Sweeping is O(n), so a flood of new clients sweeps at most once a second
+        if shard.last_sweep != now:
+            shard.sweep(now)
+        if len(shard.buckets) < self.max_shard_keys:
+            return
+        if not shard.full_logged:
+            shard.full_logged = True
+            logger.warning(
+                "Rate limiter shard full, evicting least recently used clients",
+                extra={"max_shard_keys": self.max_shard_keys}
+            )
+        shard.buckets.popitem(last=False)
+
+    def sample_rejection(self, bucket_key: str, per: int, now: Optional[float] = None) -> Optional[int]:
+        """
+        Decide whether a rejected request should be logged.
+        
+        At most one rejection per bucket and period is logged, so a client
+        hammering the limiter can't turn every rejected request into a log write.
+        
+        Returns:
+            Optional[int]: Number of rejections suppressed since the last logged
+            one, or None if this rejection should be suppressed as well
+        """
+        now = int(time.time() if now is None else now)
+        shard = self._get_shard(bucket_key)
+        with shard.lock:
+            bucket = shard.buckets.get(bucket_key)
+            if bucket is None:
+                return 0
+            if now - bucket.last_audit < per:
+                bucket.suppressed += 1
+                return None
+            suppressed = bucket.suppressed
+            bucket.last_audit = now
+            bucket.suppressed = 0
+        return suppressed
 
 class RateLimitExceeded(Exception):
     """Exception raised when rate limit is exceeded"""
@@ -106,18 +263,105 @@ class RateLimitExceeded(Exception):
 # Global rate limiter instance
 limiter = RateLimiter()
 
+def _compile_prefixes(prefixes) -> Optional[re.Pattern]:
+    """Compile path prefixes into a single regex that matches the longest one"""
+    if not prefixes:
+        return None
+    ordered = sorted(prefixes, key=len, reverse=True)
+    return re.compile("|".join(re.escape(prefix) for prefix in ordered))
+
+# Compiled RATE_LIMIT_EXCLUDED_ENDPOINTS and RATE_LIMITS prefixes, along with
+# the setting they were built from so a replaced setting is picked up
+_excluded_pattern: Tuple[Optional[list], Optional[re.Pattern]] = (None, None)
+_rate_limits_pattern: Tuple[Optional[dict], Optional[re.Pattern]] = (None, None)
+
+def is_excluded_path(path: str) -> bool:
+    """Check if a path starts with one of the excluded endpoints"""
+    global _excluded_pattern
+    source, pattern = _excluded_pattern
+    if source is not settings.RATE_LIMIT_EXCLUDED_ENDPOINTS:
+        pattern = _compile_prefixes(settings.RATE_LIMIT_EXCLUDED_ENDPOINTS)
+        _excluded_pattern = (settings.RATE_LIMIT_EXCLUDED_ENDPOINTS, pattern)
+    return pattern is not None and pattern.match(path) is not None
+
+def get_path_rate_limits(path: str) -> Dict[str, int]:
+    """Get the rate limits of the longest matching RATE_LIMITS prefix, or the defaults"""
+    global _rate_limits_pattern
+    source, pattern = _rate_limits_pattern
+    if source is not settings.RATE_LIMITS:
+        pattern = _compile_prefixes(settings.RATE_LIMITS)
+        _rate_limits_pattern = (settings.RATE_LIMITS, pattern)
+    match = pattern.match(path) if pattern is not None else None
+    if match:
+        return settings.RATE_LIMITS[match.group()]
+    return {
+        "rate": settings.RATE_LIMIT_DEFAULT_RATE,
+        "per": settings.RATE_LIMIT_DEFAULT_PERIOD
+    }
+
+def log_rate_limit_exceeded(request: Request, limit_info: Dict[str, Any], per: int) -> None:
+    """Log and audit a rejected request, sampled to once per bucket and period"""
+    suppressed = limiter.sample_rejection(
+        limit_info["key"],
+        per,
+        now=getattr(request.state, "request_time", None)
+    )
+    if suppressed is None:
+        return
+
+    logger.warning(
+        "Rate limit exceeded",
+        extra={
+            "bucket_key": limit_info["key"],
+            "path": request.url.path,
+            "method": request.method,
+            "limit": limit_info["limit"],
+            "reset": limit_info["reset"],
+            "suppressed_count": suppressed
+        }
+    )
+
+    # Audit log rate limit exceeded
+    try:
+        api_key = getattr(request.state, "api_key", None)
+        audit_log(
+            action=AuditAction.RATE_LIMIT_EXCEEDED,  # Use enum value
+            user_id=str(api_key.user_id) if api_key else None,
+            details={
+                "path": request.url.path,
+                "method": request.method,
+                "limit_info": limit_info,
+                "suppressed_count": suppressed
+            }
+        )
+    except Exception as e:
+        logger.error(f"Failed to log rate limit exceeded: {str(e)}")
+
+_RATE_LIMIT_HEADER_NAMES = frozenset((
+    b"x-ratelimit-limit",
+    b"x-ratelimit-remaining",
+    b"x-ratelimit-reset",
+    b"ratelimit-policy",
+    b"retry-after"
+))
+
+@lru_cache(maxsize=256)
+def _window_rate_limit_headers(limit: int, per: int, reset: int) -> Tuple[Tuple[bytes, bytes], ...]:
+    """Encode the rate limit headers that are the same for every request in a window"""
+    return (
+        (b"x-ratelimit-limit", str(limit).encode("latin-1")),
+        (b"x-ratelimit-reset", str(reset).encode("latin-1")),
+        (b"ratelimit-policy", f"{limit};w={per}".encode("latin-1"))
+    )
+
 def add_rate_limit_headers(response: Response, limit_info: Dict[str, Any]) -> None:
     """Add standard rate limit headers to response"""
-    response.headers.update({
-        "X-RateLimit-Limit": str(limit_info["limit"]),
-        "X-RateLimit-Remaining": str(limit_info["remaining"]),
-        "X-RateLimit-Reset": str(limit_info["reset"]),
-        "RateLimit-Policy": f"{limit_info['limit']};w={60}",
-        "RateLimit-Limit": str(limit_info["limit"]),
-        "RateLimit-Remaining": str(limit_info["remaining"]),
-        "RateLimit-Reset": str(limit_info["reset"]),
-        "Retry-After": str(limit_info["retry_after"])
-    })
+    # Work on the raw header list, replacing any rate limit headers already set
+    raw = response.headers.raw
+    raw[:] = [header for header in raw if header[0] not in _RATE_LIMIT_HEADER_NAMES]
+    raw.extend(_window_rate_limit_headers(limit_info["limit"], limit_info["per"], limit_info["reset"]))
+    raw.append((b"x-ratelimit-remaining", str(limit_info["remaining"]).encode("latin-1")))
+    raw.append((b"retry-after", str(limit_info["retry_after"]).encode("latin-1")))
 
 def rate_limit(
     rate: int = settings.RATE_LIMIT_DEFAULT_RATE,
@@ -126,6 +370,11 @@ def rate_limit(
 ) -> Callable:
     """
     Rate limiting dependency for FastAPI endpoints.
+
+    Requests RateLimitMiddleware already counted in the same bucket against
+    the same limits are not checked again, the dependency then only adds the
+    rate limit headers. Otherwise the request is counted here as well, e.g.
+    against its API key when the middleware only knew the client address.
     """
     def dependency() -> Callable:
         async def rate_limit_dependency(request: Request, response: Response):
@@ -134,50 +383,37 @@ def rate_limit(
                 return
                 
             # Skip if endpoint is in the excluded list
-            if any(request.url.path.startswith(excluded) for excluded in settings.RATE_LIMIT_EXCLUDED_ENDPOINTS):
+            if is_excluded_path(request.url.path):
                 return
 
             # Skip if endpoint not in limited set
             if endpoints and request.url.path not in endpoints:
                 return
+
+            bucket_key = limiter._get_bucket_key(request)
+            counted = getattr(request.state, "rate_limit_info", None)
+            if counted is not None and counted["key"] == bucket_key:
+                # Already counted by RateLimitMiddleware
+                if counted["limit"] == rate and counted["per"] == per:
+                    add_rate_limit_headers(response, counted)
+                    return
+                # Count different limits of the same client in their own bucket
+                bucket_key = f"{bucket_key}:{rate}/{per}"
                 
             is_allowed, limit_info = limiter.check_rate_limit(
                 request,
                 response,
                 rate=rate,
-                per=per
+                per=per,
+                now=getattr(request.state, "request_time", None),
+                bucket_key=bucket_key
             )
             
             # Always add rate limit headers
             add_rate_limit_headers(response, limit_info)
             
             if not is_allowed:
-                # Log rate limit exceeded
-                logger.warning(
-                    "Rate limit exceeded",
-                    extra={
-                        "bucket_key": limit_info["key"],
-                        "path": request.url.path,
-                        "method": request.method,
-                        "limit": limit_info["limit"],
-                        "reset": limit_info["reset"]
-                    }
-                )
-                
-                # Audit log rate limit exceeded
-                try:
-                    audit_log(
-                        action=AuditAction.RATE_LIMIT_EXCEEDED,  # Use enum value
-                        user_id=getattr(request.state, "api_key", {}).get("id"),
-                        details={
-                            "path": request.url.path,
-                            "method": request.method,
-                            "limit_info": limit_info
-                        }
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to log rate limit exceeded: {str(e)}")
-                
+                log_rate_limit_exceeded(request, limit_info, per)
                 raise RateLimitExceeded(limit_info)
         
         return rate_limit_dependency
@@ -1,69 +1,66 @@
 # app/core/rate_limiting/middleware.py
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-from app.core.rate_limiting.limiter import RateLimitExceeded, limiter, rate_limit
-from fastapi.responses import JSONResponse
+from app.core.rate_limiting.limiter import (
+    limiter,
+    add_rate_limit_headers,
+    log_rate_limit_exceeded,
+    is_excluded_path,
+    get_path_rate_limits
+)
 import time
 import logging
 from app.core.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
+# Body of 429 responses, serialized once as they come in floods
+RATE_LIMITED_BODY = b'{"detail":"Rate limit exceeded","retry_after":%d}'
 
+class RateLimitMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
+        # Read the clock once and share it with everything handling the request
+        request.state.request_time = time.time()
+
         if not settings.RATE_LIMITING_ENABLED:
             return await call_next(request)
 
         path = request.url.path
         
         # Check if the path is excluded from rate limiting
-        if any(path.startswith(excluded) for excluded in settings.RATE_LIMIT_EXCLUDED_ENDPOINTS):
+        if is_excluded_path(path):
             return await call_next(request)
 
         # Get endpoint-specific limits from settings
-        rate_limits = next(
-            (limits for defined_path, limits in settings.RATE_LIMITS.items() if path.startswith(defined_path)),
-            {
-                "rate": settings.RATE_LIMIT_DEFAULT_RATE,
-                "per": settings.RATE_LIMIT_DEFAULT_PERIOD
-            }
-        )
+        rate_limits = get_path_rate_limits(path)
 
         # Apply rate limiting
-        response = Response()
         is_allowed, limit_info = limiter.check_rate_limit(
             request,
-            response,
+            None,
             rate=rate_limits["rate"],
-            per=rate_limits["per"]
+            per=rate_limits["per"],
+            now=request.state.request_time
         )
 
         # If rate limit is exceeded, return 429 response
         if not is_allowed:
-            return JSONResponse(
+            log_rate_limit_exceeded(request, limit_info, rate_limits["per"])
+            response = Response(
+                content=RATE_LIMITED_BODY % limit_info["retry_after"],
                 status_code=429,
-                content={
-                    "detail": "Rate limit exceeded",
-                    "retry_after": limit_info["retry_after"]
-                },
-                headers={
-                    "X-RateLimit-Limit": str(limit_info["limit"]),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(limit_info["reset"]),
-                    "Retry-After": str(limit_info["retry_after"])
-                }
+                media_type="application/json"
             )
+            add_rate_limit_headers(response, limit_info)
+            return response
+
+        # Let the rate_limit dependency know which bucket this request was counted in
+        request.state.rate_limit_info = limit_info
 
         # If rate limiting passes, proceed with the request
         response = await call_next(request)
         
         # Set rate limit headers for all responses
-        response.headers["X-RateLimit-Limit"] = str(limit_info["limit"])
-        response.headers["X-RateLimit-Remaining"] = str(limit_info["remaining"])
-        response.headers["X-RateLimit-Reset"] = str(limit_info["reset"])
+        add_rate_limit_headers(response, limit_info)
         
         return response
@@ -1,11 +1,16 @@
 from datetime import datetime, UTC
+import hashlib
+import hmac
 import secrets
-import bcrypt
-from typing import Optional
+import threading
+from cachetools import TTLCache
+from typing import Optional, NamedTuple, Dict, Tuple
 from fastapi import Security, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security.api_key import APIKeyHeader
 from starlette.status import HTTP_403_FORBIDDEN
-from sqlmodel import Session, select
+from sqlalchemy import bindparam, exists
+from sqlmodel import Session, select, update
 from app.models.auth.api_key import APIKey, Role
 from app.models.auth.user import User, UserStatus
 from app.core.config import settings
@@ -15,33 +20,196 @@ from app.core.audit import audit_log, AuditAction
 
 logger = logging.getLogger(__name__)
 
+class RawAPIKeyHeader(APIKeyHeader):
+    """
+    APIKeyHeader that looks the key up in the raw ASGI headers.
+
+    The header name is lowercased and encoded once instead of on every
+    request, and no Headers object is built. The OpenAPI security scheme
+    is the same as for APIKeyHeader.
+    """
+
+    def __init__(self, *, name: str, **kwargs):
+        super().__init__(name=name, **kwargs)
+        self.raw_name = name.lower().encode("latin-1")
+
+    async def __call__(self, request: Request) -> Optional[str]:
+        for header, value in request.scope["headers"]:
+            if header == self.raw_name:
+                return value.decode("latin-1") or None
+        # Missing header, let APIKeyHeader handle auto_error
+        return await super().__call__(request)
+
 # Initialize API key header
-api_key_header = APIKeyHeader(name=settings.API_KEY_HEADER_NAME, auto_error=False)
+api_key_header = RawAPIKeyHeader(
+    name=settings.API_KEY_HEADER_NAME,
+    scheme_name="APIKeyHeader",
+    auto_error=False
+)
+
+# bcrypt hashes ($2a$, $2b$, $2y$) used for keys created by earlier versions
+LEGACY_HASH_PREFIX = "$2"
+
+class CachedAPIKey(NamedTuple):
+    """
+    Read-only snapshot of a verified API key, detached from any database session.
+
+    Returned by verify_api_key whether the key was served from the cache or
+    looked up, so callers never get a row with made-up timestamps or flags.
+    """
+    id: int
+    name: str
+    role: Role
+    user_id: int
+
+# Recently verified keys, indexed by key digest
+_verified_keys: TTLCache = TTLCache(
+    maxsize=settings.API_KEY_CACHE_SIZE,
+    ttl=settings.API_KEY_CACHE_TTL
+)
+_verified_keys_lock = threading.Lock()
+
+def invalidate_api_key_cache(
+    key_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> None:
+    """
+    Drop cached key verifications, e.g. after a key or user is deactivated.
+
+    Only entries of the given key or user are dropped, so other clients keep
+    their cached verification. Without arguments the whole cache is cleared.
+    """
+    with _verified_keys_lock:
+        if key_id is None and user_id is None:
+            _verified_keys.clear()
+            return
+        # Entries may expire while walking the cache, hence get() over items()
+        for key_hash in list(_verified_keys):
+            cached = _verified_keys.get(key_hash)
+            if cached and (cached.id == key_id or cached.user_id == user_id):
+                _verified_keys.pop(key_hash, None)
+
+def get_cached_api_key(request: Request) -> Optional[CachedAPIKey]:
+    """
+    Return the cached verification of the request's API key, if any.
+
+    Only the in-process cache is consulted, so this is cheap enough to run
+    before authentication, e.g. to pick a rate limit bucket. Keys that
+    haven't been verified recently are not found.
+    """
+    for header, value in request.scope["headers"]:
+        if header == api_key_header.raw_name:
+            if not value:
+                return None
+            key_hash = hash_api_key(value.decode("latin-1"))
+            with _verified_keys_lock:
+                return _verified_keys.get(key_hash)
+    return None
+
+# last_used timestamps waiting to be written, indexed by key ID
+_pending_last_used: Dict[int, datetime] = {}
+_pending_last_used_lock = threading.Lock()
+
+def record_api_key_use(key_id: int) -> None:
+    """Buffer the last_used timestamp of an API key until the next flush."""
+    with _pending_last_used_lock:
+        _pending_last_used[key_id] = datetime.now(UTC)
+
+def flush_api_key_usage(db: Session) -> int:
+    """Write buffered last_used timestamps in a single batch. Returns the number of keys updated."""
+    with _pending_last_used_lock:
+        if not _pending_last_used:
+            return 0
+        pending = _pending_last_used.copy()
+        _pending_last_used.clear()
+
+    try:
+        # Core statement, so keys deleted in the meantime are simply skipped
+        table = APIKey.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("key_id"))
+            .values(last_used=bindparam("used_at")),
+            [{"key_id": key_id, "used_at": used_at} for key_id, used_at in pending.items()]
+        )
+    except Exception:
+        # Put the timestamps back unless the keys have been used again since
+        with _pending_last_used_lock:
+            for key_id, used_at in pending.items():
+                _pending_last_used.setdefault(key_id, used_at)
+        raise
+    return len(pending)
 
 def generate_api_key() -> str:
     """Generate a secure API key."""
     return secrets.token_urlsafe(settings.API_KEY_LENGTH)
 
 def hash_api_key(key: str) -> str:
-    """Hash an API key for storage."""
-    key_bytes = key.encode('utf-8')
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(key_bytes, salt).decode('utf-8')
+    """
+    Hash an API key for storage.
+
+    API keys are high-entropy random tokens rather than passwords, so a keyed
+    SHA-256 digest is sufficient. Unlike bcrypt the digest is deterministic,
+    which lets lookups go straight through the index on APIKey.key.
+    """
+    return hmac.new(
+        settings.API_KEY_PEPPER.encode('utf-8'),
+        key.encode('utf-8'),
+        hashlib.sha256
+    ).hexdigest()
+
+def is_legacy_key_hash(hashed_key: str) -> bool:
+    """Check whether a stored hash predates the switch to HMAC digests."""
+    return hashed_key.startswith(LEGACY_HASH_PREFIX)
 
 def verify_key_hash(key: str, hashed_key: str) -> bool:
     """Verify an API key against its hash."""
-    key_bytes = key.encode('utf-8')
-    hashed_key_bytes = hashed_key.encode('utf-8')
-    return bcrypt.checkpw(key_bytes, hashed_key_bytes)
-
-def lookup_api_key(db: Session, key: str) -> Optional[APIKey]:
-    """Look up an API key without verifying it."""
-    stmt = select(APIKey).where(APIKey.is_active == True)
-    api_keys = db.execute(stmt).scalars().all()
-    for api_key in api_keys:
-        if verify_key_hash(key, api_key.key):
-            return api_key
-    return None
+    if is_legacy_key_hash(hashed_key):
+        # Only legacy rows need bcrypt, so don't load it for every worker
+        import bcrypt
+        return bcrypt.checkpw(key.encode('utf-8'), hashed_key.encode('utf-8'))
+    return hmac.compare_digest(hash_api_key(key), hashed_key)
+
+# Key lookups are built once; only the digest is bound per call
+_lookup_stmt = (
+    select(APIKey, User.status)
+    .outerjoin(User, User.id == APIKey.user_id)
+    .where(
+        APIKey.key == bindparam("key_hash"),
+        APIKey.is_active == True
+    )
+)
+_legacy_lookup_stmt = (
+    select(APIKey, User.status)
+    .outerjoin(User, User.id == APIKey.user_id)
+    .where(
+        APIKey.key.startswith(LEGACY_HASH_PREFIX),
+        APIKey.is_active == True
+    )
+)
+
+def lookup_api_key(
+    db: Session,
+    key: str,
+    key_hash: Optional[str] = None
+) -> Optional[Tuple[APIKey, Optional[UserStatus]]]:
+    """Look up an active API key and its owner's status without verifying it."""
+    key_hash = key_hash or hash_api_key(key)
+    row = db.execute(_lookup_stmt, {"key_hash": key_hash}).first()
+    # Confirm the candidate in constant time rather than trusting the
+    # database's string comparison alone
+    if row and hmac.compare_digest(row[0].key, key_hash):
+        return row[0], row[1]
+
+    # Keys created before the switch to HMAC digests still carry a bcrypt
+    # hash and can only be found by checking each of them in turn. Check
+    # every candidate, so the time taken doesn't reveal the position of the
+    # matching key
+    match = None
+    for api_key, user_status in db.execute(_legacy_lookup_stmt).all():
+        if verify_key_hash(key, api_key.key) and match is None:
+            match = api_key, user_status
+    return match
 
 def create_api_key(
     db: Session,
@@ -51,21 +219,21 @@ def create_api_key(
 ) -> APIKey:
     """Create a new API key."""
     try:
-        # Check if user exists and is active
-        user = db.get(User, user_id)
+        # Check the user and the key name in a single round trip
+        stmt = select(
+            User.name,
+            User.status,
+            exists().where(
+                APIKey.name == name,
+                APIKey.user_id == user_id
+            ).label("duplicate")
+        ).where(User.id == user_id)
+        user = db.execute(stmt).one_or_none()
         if not user:
             raise ValueError(f"User with ID {user_id} does not exist")
         if user.status != UserStatus.ACTIVE:
             raise ValueError(f"User {user.name} is not active")
-
-        # Check for existing key with same name for this user
-        stmt = select(APIKey).where(
-            APIKey.name == name,
-            APIKey.user_id == user_id
-        )
-        existing = db.execute(stmt).scalar_one_or_none()
-        
-        if existing:
+        if user.duplicate:
             raise ValueError(f"API key with name '{name}' already exists for this user")
 
         # Generate and hash the key
@@ -113,31 +281,53 @@ def create_api_key(
         logger.exception("Failed to create API key")
         raise
 
-def verify_api_key(db: Session, key: str) -> Optional[APIKey]:
-    """Verify an API key and update last used timestamp."""
+def verify_api_key(db: Session, key: str) -> Optional[CachedAPIKey]:
+    """Verify an API key and record its last used timestamp."""
     try:
-        api_key = lookup_api_key(db, key)
-        if api_key:
+        key_hash = hash_api_key(key)
+        with _verified_keys_lock:
+            api_key = _verified_keys.get(key_hash)
+
+        # Repeat callers are served from the cache, skipping the key lookup
+        if api_key is None:
+            found = lookup_api_key(db, key, key_hash)
+            if not found:
+                return None
+            row, user_status = found
+
             # Check if the user is active
-            user = db.get(User, api_key.user_id)
-            if user and user.status == UserStatus.ACTIVE:
-                api_key.last_used = datetime.now(UTC)
+            if user_status != UserStatus.ACTIVE:
+                logger.warning(f"Attempt to use API key for inactive user: {row.user_id}")
+                return None
+
+            # Migrate legacy bcrypt hashes now that the plain key is known,
+            # so the next lookup goes through the index
+            if is_legacy_key_hash(row.key):
+                row.key = key_hash
                 db.flush()
-                
-                # Audit logging
-                audit_log(
-                    action=AuditAction.API_KEY_USED,
-                    user_id=str(api_key.user_id),
-                    details={
-                        "key_name": api_key.name,
-                        "key_id": api_key.id
-                    }
-                )
-                return api_key
-            else:
-                logger.warning(f"Attempt to use API key for inactive user: {api_key.user_id}")
-        
-        return None
+                logger.info(f"Rehashed legacy API key {row.id}")
+
+            api_key = CachedAPIKey(
+                id=row.id,
+                name=row.name,
+                role=row.role,
+                user_id=row.user_id
+            )
+            with _verified_keys_lock:
+                _verified_keys[key_hash] = api_key
+
+        record_api_key_use(api_key.id)
+
+        # Audit logging
+        audit_log(
+            action=AuditAction.API_KEY_USED,
+            user_id=str(api_key.user_id),
+            details={
+                "key_name": api_key.name,
+                "key_id": api_key.id
+            }
+        )
+        return api_key
         
     except Exception as e:
         logger.exception("Failed to verify API key")
@@ -154,6 +344,7 @@ def deactivate_api_key(
         if api_key:
             api_key.is_active = False
             db.flush()
+            invalidate_api_key_cache(key_id=key_id)
             
             # Audit logging
             audit_log(
@@ -212,7 +403,7 @@ async def get_api_key(
     request: Request,
     api_key: str = Security(api_key_header),
     db: Session = Depends(get_db)
-) -> Optional[APIKey]:
+) -> Optional[CachedAPIKey]:
     """
     Dependency for validating API keys in FastAPI endpoints.
     Returns None if API key auth is disabled.
@@ -220,6 +411,11 @@ async def get_api_key(
     if not settings.API_KEY_AUTH_ENABLED:
         logger.debug("API key authentication is disabled")
         return None
+
+    # Already verified earlier in this request
+    key = get_current_api_key(request)
+    if key is not None:
+        return key
         
     if not api_key:
         logger.warning("API key missing in request")
@@ -229,7 +425,8 @@ async def get_api_key(
         )
     
     try:
-        key = verify_api_key(db, api_key)
+        # Verification may hit the database and bcrypt, keep it off the event loop
+        key = await run_in_threadpool(verify_api_key, db, api_key)
         if not key:
             # Audit logging for failed attempts
             audit_log(
@@ -258,7 +455,14 @@ async def get_api_key(
             detail="Internal server error during API key validation"
         )
 
-def require_admin(api_key: APIKey = Depends(get_api_key)):
+def get_current_api_key(request: Request) -> Optional[CachedAPIKey]:
+    """
+    Return the API key already verified for this request, if any.
+    Never touches the database; use get_api_key to verify a key.
+    """
+    return getattr(request.state, "api_key", None)
+
+def require_admin(api_key: Optional[CachedAPIKey] = Depends(get_api_key)):
     """
     Dependency for requiring admin role in FastAPI endpoints.
     Must be used after get_api_key dependency.
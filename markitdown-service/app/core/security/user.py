@@ -4,6 +4,7 @@ from sqlmodel import Session, select
 from app.models.auth.user import User, UserStatus
 from app.core.config import settings
 from app.core.audit import audit_log, AuditAction
+from app.core.security.api_key import invalidate_api_key_cache
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +71,7 @@ def update_user_status(
         
     user.status = status
     db.commit()
+    invalidate_api_key_cache(user_id=user_id)
     
     audit_log(
         action=AuditAction.USER_STATUS_UPDATED,
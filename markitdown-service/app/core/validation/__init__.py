@@ -1,16 +1,20 @@
 # app/core/validation/__init__.py
 from .validators import (
     validate_file_size,
+    validate_content_size,
     validate_file_extension,
     validate_content_type,
     validate_file_content,
-    validate_upload_file
+    validate_upload_file,
+    validate_upload_stream
 )
 
 __all__ = [
     "validate_file_size",
+    "validate_content_size",
     "validate_file_extension",
     "validate_content_type",
     "validate_file_content",
-    "validate_upload_file"
+    "validate_upload_file",
+    "validate_upload_stream"
 ]
\ No newline at end of file
@@ -0,0 +1,81 @@
+# app/core/validation/middleware.py
+from fastapi import HTTPException, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import logging
+from app.core.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Allowance for multipart boundaries, part headers and form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+def get_max_body_size() -> int:
+    """Get the largest request body accepted, read per request as the limit can change"""
+    return settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+
+def body_too_large_message(max_body_size: int) -> str:
+    """Build the detail message of a rejected request body"""
+    return f"Request body exceeds maximum limit of {max_body_size} bytes"
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies larger than the upload size limit.
+
+    Requests declaring a larger Content-Length are answered with 413 before
+    any of the body is read. Bodies without a Content-Length are counted
+    while they are received and aborted as soon as they cross the limit,
+    so an oversized upload is never parsed or spooled in full.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_body_size = get_max_body_size()
+        content_length = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                content_length = value
+                break
+
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body_size:
+            logger.warning(
+                "Request body too large",
+                extra={
+                    "path": scope["path"],
+                    "content_length": int(content_length),
+                    "max_body_size": max_body_size
+                }
+            )
+            body = f'{{"detail":"{body_too_large_message(max_body_size)}"}}'.encode("latin-1")
+            await send({
+                "type": "http.response.start",
+                "status": status.HTTP_413_CONTENT_TOO_LARGE,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    (b"connection", b"close")
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def receive_limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                        detail=body_too_large_message(max_body_size)
+                    )
+            return message
+
+        await self.app(scope, receive_limited, send)
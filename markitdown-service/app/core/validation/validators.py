@@ -1,13 +1,31 @@
 # app/core/validation/validators.py
+import io
 import os
-from typing import Optional, Tuple, Dict, Any
+import re
+import shutil
+from functools import lru_cache
+from typing import Optional, Tuple, Dict, Any, BinaryIO
 from fastapi import UploadFile, Request
+from starlette.concurrency import run_in_threadpool
 from app.core.errors.exceptions import FileProcessingError, ContentTypeError
 from app.core.config.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# settings.SUPPORTED_EXTENSIONS as a lowercase frozenset, along with the list
+# it was built from so a replaced setting is picked up
+_supported_extensions: Tuple[Optional[list], frozenset] = (None, frozenset())
+
+def get_supported_extensions() -> frozenset:
+    """Get the supported file extensions as a cached lowercase frozenset."""
+    global _supported_extensions
+    source, extensions = _supported_extensions
+    if source is not settings.SUPPORTED_EXTENSIONS:
+        extensions = frozenset(ext.lower() for ext in settings.SUPPORTED_EXTENSIONS)
+        _supported_extensions = (settings.SUPPORTED_EXTENSIONS, extensions)
+    return extensions
+
 def validate_file_size(content: bytes, max_size: int = None) -> None:
     """
     Validate file size against configured limits.
@@ -19,18 +37,30 @@ def validate_file_size(content: bytes, max_size: int = None) -> None:
     Raises:
         FileProcessingError: If file size exceeds limit
     """
-    max_size = max_size or settings.MAX_FILE_SIZE
-    content_size = len(content)
+    validate_content_size(len(content), max_size)
+
+def validate_content_size(content_size: int, max_size: int = None) -> None:
+    """
+    Validate a content size in bytes, known before the content itself is read.
     
+    Args:
+        content_size: Size of the content in bytes
+        max_size: Optional custom max size, defaults to settings.MAX_FILE_SIZE
+    
+    Raises:
+        FileProcessingError: If the size exceeds the limit
+    """
+    max_size = max_size or settings.MAX_FILE_SIZE
     if content_size > max_size:
-        logger.warning(
-            "File size validation failed",
-            extra={
-                "size": content_size,
-                "limit": max_size,
-                "exceeded_by": content_size - max_size
-            }
-        )
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning(
+                "File size validation failed",
+                extra={
+                    "size": content_size,
+                    "limit": max_size,
+                    "exceeded_by": content_size - max_size
+                }
+            )
         raise FileProcessingError(
             f"File size ({content_size} bytes) exceeds maximum limit of {max_size} bytes"
         )
@@ -49,8 +79,12 @@ def validate_file_extension(filename: str, allowed_extensions: Optional[set] = N
     Raises:
         FileProcessingError: If file extension is not supported
     """
-    allowed_extensions = allowed_extensions or set(settings.SUPPORTED_EXTENSIONS)
-    _, ext = os.path.splitext(filename)
+    allowed_extensions = allowed_extensions or get_supported_extensions()
+    # Same result as os.path.splitext on the basename, with either path
+    # separator; dotfiles such as ".env" or ".pdf" have no extension
+    basename = filename.replace('\\', '/').rpartition('/')[2]
+    head, sep, tail = basename.rpartition('.')
+    ext = sep + tail if head.lstrip('.') else ''
     ext_lower = ext.lower()
     
     if not ext_lower:
@@ -58,19 +92,27 @@ def validate_file_extension(filename: str, allowed_extensions: Optional[set] = N
         raise FileProcessingError("No file extension provided")
     
     if ext_lower not in allowed_extensions:
-        logger.warning(
-            "Unsupported file extension",
-            extra={
-                "extension": ext_lower,
-                "supported_extensions": list(allowed_extensions)
-            }
-        )
+        # Rejections are common on probe traffic, skip building the payload
+        # when warnings are filtered out
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning(
+                "Unsupported file extension",
+                extra={
+                    "extension": ext_lower,
+                    "supported_extensions": sorted(allowed_extensions)
+                }
+            )
         raise FileProcessingError(
-            f"Unsupported file type: {ext}. Supported types: {', '.join(allowed_extensions)}"
+            f"Unsupported file type: {ext}. Supported types: {', '.join(sorted(allowed_extensions))}"
         )
     
     return ext_lower
 
+@lru_cache(maxsize=16)
+def _content_type_pattern(allowed_types: Tuple[str, ...]) -> re.Pattern:
+    """Compile allowed content type prefixes into a single regex."""
+    return re.compile("|".join(re.escape(allowed) for allowed in allowed_types))
+
 def validate_content_type(
     content_type: str,
     allowed_types: Tuple[str, ...] = ('text/html', 'application/xhtml+xml')
@@ -90,16 +132,17 @@ def validate_content_type(
         raise ContentTypeError("No content type provided")
     
     # Strip parameters from content type (e.g., 'text/html; charset=utf-8' -> 'text/html')
-    base_content_type = content_type.split(';')[0].strip()
+    base_content_type = content_type.partition(';')[0].strip()
     
-    if not any(base_content_type.startswith(allowed) for allowed in allowed_types):
-        logger.warning(
-            "Unsupported content type",
-            extra={
-                "content_type": base_content_type,
-                "allowed_types": allowed_types
-            }
-        )
+    if not _content_type_pattern(tuple(allowed_types)).match(base_content_type):
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning(
+                "Unsupported content type",
+                extra={
+                    "content_type": base_content_type,
+                    "allowed_types": allowed_types
+                }
+            )
         raise ContentTypeError(
             f"Unsupported content type: {base_content_type}. "
             f"Supported types: {', '.join(allowed_types)}"
@@ -140,7 +183,8 @@ async def validate_upload_file(request: Optional[Request] = None, file: Optional
         **kwargs: Additional keyword arguments (ignored)
     
     Returns:
-        Tuple[str, bytes]: Validated extension and file content
+        Tuple[str, bytes]: Validated extension and file content. The upload
+        is not rewound, callers should use the returned content
     
     Raises:
         FileProcessingError: If validation fails
@@ -151,9 +195,15 @@ async def validate_upload_file(request: Optional[Request] = None, file: Optional
     # Validate extension first (quick check before reading content)
     ext = validate_file_extension(file.filename)
     
-    # Read and validate content
-    content = await file.read()
-    await file.seek(0)  # Reset file position for subsequent reads
+    # Reject uploads known to be too large without reading them; the
+    # multipart parser has already spooled them to disk
+    max_size = settings.MAX_FILE_SIZE
+    size = getattr(file, "size", None)
+    if size is not None:
+        validate_content_size(size, max_size)
+    
+    # Read and validate content, never more than one byte past the limit
+    content = await file.read(max_size + 1)
     
     metadata = {
         "filename": file.filename,
@@ -167,6 +217,68 @@ async def validate_upload_file(request: Optional[Request] = None, file: Optional
     
     return ext, content
 
+def open_upload_stream(spooled: BinaryIO) -> BinaryIO:
+    """
+    Open a buffered reader of our own over an upload's spooled content.
+
+    The reader is opened on a duplicate of the spooled file's descriptor,
+    fileno() first rolls an in-memory spool over to disk. Streams without
+    a descriptor are copied into memory in 64 KiB chunks. Blocking, run it
+    in the thread pool.
+    """
+    try:
+        fd = os.dup(spooled.fileno())
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        spooled.seek(0)
+        stream = io.BytesIO()
+        shutil.copyfileobj(spooled, stream, 1 << 16)
+    else:
+        stream = open(fd, "rb")
+    stream.seek(0)
+    return stream
+
+async def validate_upload_stream(file: Optional[UploadFile] = None, **kwargs) -> Tuple[str, BinaryIO]:
+    """
+    Validate an uploaded file without reading it into memory.
+    
+    The multipart parser has already spooled the upload and recorded its
+    size, so the checks only need the size and the converter can read
+    from the spooled file through a reader of its own.
+    
+    Args:
+        file: FastAPI UploadFile object
+        **kwargs: Additional keyword arguments (ignored)
+    
+    Returns:
+        Tuple[str, BinaryIO]: Validated extension and a buffered stream
+        positioned at the start of the content, the caller must close it
+    
+    Raises:
+        FileProcessingError: If validation fails
+    """
+    if not file:
+        raise FileProcessingError("No file provided")
+
+    size = getattr(file, "size", None)
+    if size is None:
+        # Size unknown, fall back to reading the content
+        ext, content = await validate_upload_file(file=file)
+        return ext, io.BytesIO(content)
+
+    ext = validate_file_extension(file.filename)
+    if not size:
+        validate_file_content(b"", {
+            "filename": file.filename,
+            "content_type": file.content_type,
+            "extension": ext,
+            "size": size
+        })
+    validate_content_size(size)
+
+    # A SpooledTemporaryFile is not a BufferedIOBase, which MarkItDown's type
+    # detection requires, the reader opened over it is
+    return ext, await run_in_threadpool(open_upload_stream, file.file)
+
 async def validate_text_input(request: Optional[Request] = None, content: bytes = None, **kwargs) -> None:
     """
     Validate text input content.
@@ -192,9 +304,13 @@ async def validate_text_input(request: Optional[Request] = None, content: bytes
 
 __all__ = [
     "validate_file_size",
+    "validate_content_size",
     "validate_file_extension",
+    "get_supported_extensions",
     "validate_content_type",
     "validate_file_content",
     "validate_upload_file",
+    "validate_upload_stream",
+    "open_upload_stream",
     "validate_text_input"
 ]
@@ -1,3 +1,5 @@
+from typing import List
+from sqlalchemy import inspect
 from sqlmodel import SQLModel, select
 from app.db.session import get_engine, get_db_session
 from app.core.security.api_key import create_api_key
@@ -9,12 +11,31 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def create_missing_tables(engine) -> List[str]:
+    """
+    Create the tables that don't exist yet and return their names.
+
+    create_all checks every table separately; listing the existing tables
+    once lets an already initialized database skip it entirely.
+    """
+    existing = set(inspect(engine).get_table_names())
+    missing = [
+        table for table in SQLModel.metadata.sorted_tables
+        if table.name not in existing
+    ]
+    if missing:
+        SQLModel.metadata.create_all(engine, tables=missing, checkfirst=True)
+    return [table.name for table in missing]
+
 def init_db(db_session) -> None:
     """Initialize the database."""
     engine = get_engine()
     logger.info("Creating database tables...")
-    SQLModel.metadata.create_all(engine, checkfirst=True)
-    logger.info("Database tables created successfully")
+    created = create_missing_tables(engine)
+    if created:
+        logger.info(f"Database tables created successfully: {', '.join(created)}")
+    else:
+        logger.info("Database tables already exist")
 
     # Create initial admin user and API key if enabled
     if settings.API_KEY_AUTH_ENABLED:
@@ -1,3 +1,4 @@
+from sqlalchemy import event
 from sqlmodel import create_engine, Session
 from app.core.config import settings
 from functools import lru_cache
@@ -7,16 +8,38 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# WAL lets API key lookups read while last_used updates are being written
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to a new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
 @lru_cache()
 def get_engine():
     """Create cached SQLModel engine."""
-    return create_engine(
+    engine = create_engine(
         settings.DATABASE_URL,
         connect_args=settings.DATABASE_CONNECT_ARGS,
         pool_size=settings.DATABASE_POOL_SIZE,
         pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
         echo=settings.DATABASE_ECHO,
     )
+    if settings.DATABASE_URL.startswith("sqlite"):
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    return engine
 
 @contextmanager
 def get_db_session():
@@ -30,7 +53,9 @@ def get_db_session():
             # or rollback on exception
     """
     engine = get_engine()
-    session = Session(engine)
+    # Writes flush explicitly, and objects stay usable after commit without
+    # being reloaded from the database
+    session = Session(engine, expire_on_commit=False, autoflush=False)
     try:
         yield session
         session.commit()
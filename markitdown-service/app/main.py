@@ -1,3 +1,5 @@
+import asyncio
+import anyio
 import time
 import logging
 import logging.config
@@ -7,23 +9,28 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy import text
+from sqlmodel import Session
 import os
 from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
 from app.api.v1.endpoints import conversion, admin
-from app.core.security.api_key import get_api_key
+from app.core.security.api_key import get_api_key, flush_api_key_usage
 from app.db.init_db import ensure_db_initialized
 from app.db.session import get_db, get_db_session
 from app.core.config.settings import settings
 from app.core.logging.config import get_web_logging_config
-from app.core.audit import audit_log, AuditAction
+from app.core.audit import audit_log, flush_audit_log, AuditAction
 from app.core.logging.management import LogManager
 from app.core.rate_limiting.middleware import RateLimitMiddleware
+from app.core.validation.middleware import RequestSizeLimitMiddleware
 from app.core.errors.handlers import handle_api_operation
 
 # Initialize logging
 log_dir = Path(settings.LOG_DIR)
 log_dir.mkdir(parents=True, exist_ok=True)
+log_dir_name = str(log_dir)
 
 # Initialize log manager
 log_manager = LogManager()
@@ -55,6 +62,22 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         content={"detail": "Invalid request parameters", "errors": exc.errors()}
     )
 
+def write_api_key_usage() -> None:
+    """Write buffered API key last_used timestamps to the database"""
+    with get_db_session() as db:
+        updated = flush_api_key_usage(db)
+    if updated:
+        db_logger.debug(f"Updated last_used of {updated} API keys")
+
+async def write_api_key_usage_periodically() -> None:
+    """Background task flushing API key usage every API_KEY_LAST_USED_FLUSH_INTERVAL seconds"""
+    while True:
+        await asyncio.sleep(settings.API_KEY_LAST_USED_FLUSH_INTERVAL)
+        try:
+            await run_in_threadpool(write_api_key_usage)
+        except Exception:
+            logger.exception("Failed to write API key usage")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -76,9 +99,16 @@ async def lifespan(app: FastAPI):
         logger.debug(f"API Key Auth: {settings.API_KEY_AUTH_ENABLED}")
         logger.debug(f"Log Directory: {settings.LOG_DIR}")
         
+        # Conversions run in the threadpool, size it for them
+        anyio.to_thread.current_default_thread_limiter().total_tokens = settings.CONVERSION_THREAD_LIMIT
+        
         # Initialize database
         logger.info("Initializing database...")
         ensure_db_initialized()
+        usage_writer = asyncio.create_task(write_api_key_usage_periodically())
+
+        # Shared client for URL conversions, keeps connections pooled
+        app.state.http_client = conversion.create_http_client()
         
         # Check log rotation configuration
         if settings.ENVIRONMENT in ["production", "development"]:
@@ -121,6 +151,12 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Initiating application shutdown...")
     try:
+        # Write outstanding API key usage before exiting
+        usage_writer.cancel()
+        await run_in_threadpool(write_api_key_usage)
+
+        await app.state.http_client.aclose()
+        
         # Ensure all logs are flushed
         for handler in logging.getLogger().handlers:
             handler.flush()
@@ -140,6 +176,9 @@ async def lifespan(app: FastAPI):
             status="failure"
         )
 
+    # Write the queued audit records, including the shutdown event
+    await run_in_threadpool(flush_audit_log)
+
 # Initialize FastAPI app with lifespan
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -151,6 +190,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Reject oversized request bodies before they are read. Added before rate
+# limiting so it runs inside it, where its receive errors reach the router as-is
+app.add_middleware(RequestSizeLimitMiddleware)
+
 # Add rate limiting
 app.add_middleware(RateLimitMiddleware)
 
@@ -188,7 +231,6 @@ from fastapi.responses import PlainTextResponse, Response
     "public_convert_file",
     error_map={
         "ConversionError": (status.HTTP_422_UNPROCESSABLE_ENTITY, None),
-        "RateLimitExceeded": (status.HTTP_429_TOO_MANY_REQUESTS, None),
         **conversion.DEFAULT_ERROR_MAP
     }
 )
@@ -198,41 +240,30 @@ async def public_convert_file(
     file: UploadFile = File(...),
 ) -> PlainTextResponse:
     """Convert an uploaded file to markdown (public endpoint)."""
-    # Import required modules
-    from app.core.security.api_key import get_api_key_from_string
-
-    # Apply rate limiting
-    await conversion.rate_limit(
-        rate=settings.RATE_LIMITS["/api/v1/convert/file"]["rate"],
-        per=settings.RATE_LIMITS["/api/v1/convert/file"]["per"]
-    )(request, response)
-
-    # Use dev admin key for public requests
-    api_key = get_api_key_from_string("dev-admin-key")
-
-    ext, content = await conversion.validate_upload_file(file=file)
-
-    conversion.log_conversion_attempt(
-        "file",
-        {
-            "filename": file.filename,
-            "content_type": file.content_type,
-            "extension": ext,
-        },
-        str(api_key.id) if api_key else "public"
-    )
+    # Rate limited by RateLimitMiddleware under its own RATE_LIMITS entry
+    ext, stream = await conversion.validate_upload_stream(file=file)
 
-    with conversion.save_temp_file(content, suffix=ext) as temp_file_path:
-        markdown_content = conversion.process_conversion(
-            temp_file_path,
+    with stream:
+        conversion.log_conversion_attempt(
+            "file",
+            {
+                "filename": file.filename,
+                "content_type": file.content_type,
+                "extension": ext,
+            },
+            "public"
+        )
+
+        markdown_content = await conversion.run_conversion(
+            stream,
             ext,
             content_type=file.content_type
         )
 
-        return PlainTextResponse(
-            content=markdown_content,
-            status_code=status.HTTP_200_OK
-        )
+    return PlainTextResponse(
+        content=markdown_content,
+        status_code=status.HTTP_200_OK
+    )
 
 # Include admin router with API key dependency
 app.include_router(
@@ -254,30 +285,43 @@ async def serve_frontend():
     )
 
 # Health check endpoint (no API key required)
+# Monotonic time of the last probe that found the database and logs healthy
+_last_healthy_probe = float("-inf")
+
+def check_log_directory(log_dir: Path) -> Tuple[str, Optional[str]]:
+    """Check that the log directory exists and is writable, returning (status, error)"""
+    try:
+        if not log_dir.exists():
+            return "warning", "Log directory does not exist"
+        if not os.access(log_dir, os.W_OK):
+            return "warning", "Log directory not writable"
+    except Exception as e:
+        return "error", str(e)
+    return "healthy", None
+
+def probe_health(db: Session, log_dir: Path) -> Tuple[str, Optional[str]]:
+    """Run the blocking health probes, returning the log directory (status, error)"""
+    # Verify database connection with the request's session
+    db.execute(text("SELECT 1"))
+    db_logger.debug("Database health check successful")
+    return check_log_directory(log_dir)
+
 @app.get("/health", tags=["system"])
 @handle_api_operation("health_check")
-async def health_check():
+async def health_check(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Check the health of the service."""
+    global _last_healthy_probe
     try:
-        # Verify database connection using context manager
-        with get_db_session() as db:
-            db.execute(text("SELECT 1"))
-            db_logger.debug("Database health check successful")
-        
-        # Check log directory status
         log_status = "healthy"
         log_error = None
-        try:
-            log_dir = Path(settings.LOG_DIR)
-            if not log_dir.exists():
-                log_status = "warning"
-                log_error = "Log directory does not exist"
-            elif not os.access(log_dir, os.W_OK):
-                log_status = "warning"
-                log_error = "Log directory not writable"
-        except Exception as e:
-            log_status = "error"
-            log_error = str(e)
+
+        # Probes are frequent, reuse a recent fully healthy probe result
+        now = time.monotonic()
+        probed = now - _last_healthy_probe >= settings.HEALTH_CHECK_CACHE_TTL
+        if probed:
+            log_status, log_error = await run_in_threadpool(probe_health, db, log_dir)
+            if log_status == "healthy":
+                _last_healthy_probe = now
         
         health_status = {
             "status": "healthy",
@@ -288,7 +332,7 @@ async def health_check():
             "database": "connected",
             "logging": {
                 "status": log_status,
-                "directory": str(log_dir),
+                "directory": log_dir_name,
                 "error": log_error
             },
             "rate_limiting": {
@@ -301,14 +345,16 @@ async def health_check():
             }
         }
         
-        # Log health check with detailed status in debug mode
-        logger.debug("Health check details", extra=health_status)
-        
-        audit_log(
-            action=AuditAction.HEALTH_CHECK,
-            user_id=None,
-            details=health_status
-        )
+        # Log and audit the checks that actually probed, a reused result
+        # has already been recorded
+        if probed:
+            logger.debug("Health check details", extra=health_status)
+            
+            audit_log(
+                action=AuditAction.HEALTH_CHECK,
+                user_id=None,
+                details=health_status
+            )
         
         # If there are any warnings, reflect in response code
         if log_status == "warning":
@@ -345,6 +391,7 @@ async def health_check():
         )
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
     
     # Ensure log directory exists before starting server
@@ -355,11 +402,14 @@ if __name__ == "__main__":
     log_config = get_web_logging_config()
     
     uvicorn.run(
-        "main:app",
+        "app.main:app",
         host="0.0.0.0",
         port=8000,
         reload=settings.ENVIRONMENT == "development",
         log_level=settings.LOG_LEVEL.lower(),
         log_config=log_config,
+        # uvloop is not available on Windows, fall back to asyncio there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
         workers=1
     )
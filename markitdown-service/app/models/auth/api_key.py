@@ -1,6 +1,7 @@
-from datetime import datetime, UTC
+from datetime import datetime
 from typing import Optional, TYPE_CHECKING
 from sqlmodel import SQLModel, Field, Relationship
+from app.models.utils import utc_now
 from enum import Enum
 
 if TYPE_CHECKING:
@@ -17,7 +18,7 @@ class APIKey(SQLModel, table=True):
     key: str = Field(index=True)
     name: str
     role: Role
-    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    created_at: datetime = Field(default_factory=utc_now)
     last_used: Optional[datetime] = Field(default=None)
     is_active: bool = Field(default=True)
     user_id: Optional[int] = Field(default=None, foreign_key="users.id")
@@ -1,6 +1,7 @@
-from datetime import datetime, UTC
+from datetime import datetime
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
+from app.models.utils import utc_now
 from enum import Enum
 
 class UserStatus(str, Enum):
@@ -14,7 +15,7 @@ class User(SQLModel, table=True):
     name: str
     email: str = Field(unique=True, index=True)
     status: UserStatus = Field(default=UserStatus.ACTIVE)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    created_at: datetime = Field(default_factory=utc_now)
     
     # Relationships
     api_keys: List["APIKey"] = Relationship(back_populates="user")
\ No newline at end of file
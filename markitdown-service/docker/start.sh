@@ -53,4 +53,4 @@ ls -l /app/logs
 
 # Start the application
 echo "Starting uvicorn..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000 "$@"
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools "$@"
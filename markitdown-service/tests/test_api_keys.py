@@ -0,0 +1,154 @@
+import bcrypt
+import pytest
+from pydantic import ValidationError
+from sqlmodel import delete
+from app.core.config.settings import Settings
+from app.core.security.api_key import (
+    _verified_keys,
+    CachedAPIKey,
+    create_api_key,
+    deactivate_api_key,
+    flush_api_key_usage,
+    hash_api_key,
+    invalidate_api_key_cache,
+    verify_key_hash,
+    verify_api_key
+)
+from app.core.security.user import create_user, update_user_status
+from app.models.auth.api_key import Role, APIKey
+from app.models.auth.user import User, UserStatus
+
+TEST_EMAIL = "test-api-keys@example.com"
+
+@pytest.fixture
+def test_user(db_session):
+    """Create a user that owns the API keys created in these tests"""
+    db_session.exec(delete(User).where(User.email == TEST_EMAIL))
+    db_session.commit()
+    user = create_user(db=db_session, name="API Key Tests", email=TEST_EMAIL)
+    yield user
+    db_session.exec(delete(APIKey).where(APIKey.user_id == user.id))
+    db_session.exec(delete(User).where(User.id == user.id))
+    db_session.commit()
+
+def test_hash_api_key_is_deterministic():
+    """Test that the same key always produces the same digest"""
+    assert hash_api_key("some-key") == hash_api_key("some-key")
+    assert hash_api_key("some-key") != hash_api_key("other-key")
+    assert hash_api_key("some-key") != "some-key"
+
+def test_api_key_pepper_required():
+    """Test that a pepper is required outside development and test"""
+    with pytest.raises(ValidationError, match="API_KEY_PEPPER"):
+        Settings(ENVIRONMENT="production", API_KEY_PEPPER=None)
+    assert Settings(ENVIRONMENT="production", API_KEY_PEPPER="pepper").API_KEY_PEPPER == "pepper"
+    assert Settings(ENVIRONMENT="test", API_KEY_PEPPER=None).API_KEY_PEPPER
+
+def test_verify_key_hash():
+    """Test verification against both current and legacy hashes"""
+    assert verify_key_hash("some-key", hash_api_key("some-key"))
+    assert not verify_key_hash("other-key", hash_api_key("some-key"))
+
+    legacy_hash = bcrypt.hashpw(b"some-key", bcrypt.gensalt(rounds=4)).decode('utf-8')
+    assert verify_key_hash("some-key", legacy_hash)
+    assert not verify_key_hash("other-key", legacy_hash)
+
+def test_verify_api_key(db_session, test_user):
+    """Test that a newly created key verifies and an unknown key does not"""
+    api_key = create_api_key(db=db_session, name="verify", user_id=test_user.id)
+    db_session.commit()
+
+    verified = verify_api_key(db_session, api_key.key)
+    assert verified is not None
+    assert verified.id == api_key.id
+    assert verify_api_key(db_session, "unknown-key") is None
+
+def test_verify_legacy_api_key(db_session, test_user):
+    """Test that keys stored with a bcrypt hash keep working"""
+    legacy_hash = bcrypt.hashpw(b"legacy-key", bcrypt.gensalt(rounds=4)).decode('utf-8')
+    legacy_key = APIKey(key=legacy_hash, name="legacy", role=Role.USER, user_id=test_user.id)
+    db_session.add(legacy_key)
+    db_session.commit()
+
+    verified = verify_api_key(db_session, "legacy-key")
+    assert verified is not None
+    assert verified.id == legacy_key.id
+
+    # The hash is migrated on the first successful verification
+    db_session.commit()
+    db_session.refresh(legacy_key)
+    assert legacy_key.key == hash_api_key("legacy-key")
+
+def test_verify_api_key_cached(db_session, test_user):
+    """Test that repeat verifications are served with the same identity"""
+    api_key = create_api_key(db=db_session, name="cached", user_id=test_user.id)
+    db_session.commit()
+
+    first = verify_api_key(db_session, api_key.key)
+    second = verify_api_key(db_session, api_key.key)
+    assert first.id == second.id == api_key.id
+    assert second.role == Role.USER
+    assert second.user_id == test_user.id
+
+    # Both the lookup and the cache hit return the same read-only snapshot
+    assert isinstance(first, CachedAPIKey)
+    assert first == second
+
+def test_deactivated_api_key_not_served_from_cache(db_session, test_user):
+    """Test that deactivating a key invalidates its cached verification"""
+    api_key = create_api_key(db=db_session, name="deactivated", user_id=test_user.id)
+    db_session.commit()
+
+    assert verify_api_key(db_session, api_key.key) is not None
+    deactivate_api_key(db_session, api_key.id)
+    db_session.commit()
+    assert verify_api_key(db_session, api_key.key) is None
+
+def test_api_key_usage_is_flushed(db_session, test_user):
+    """Test that last_used is buffered and written on flush"""
+    api_key = create_api_key(db=db_session, name="usage", user_id=test_user.id)
+    db_session.commit()
+
+    assert verify_api_key(db_session, api_key.key) is not None
+    assert db_session.get(APIKey, api_key.id).last_used is None
+
+    assert flush_api_key_usage(db_session) >= 1
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(APIKey, api_key.id).last_used is not None
+    assert flush_api_key_usage(db_session) == 0
+
+def test_api_key_of_inactive_user_rejected(db_session, test_user):
+    """Test that keys stop verifying once their owner is deactivated"""
+    api_key = create_api_key(db=db_session, name="inactive-owner", user_id=test_user.id)
+    db_session.commit()
+
+    update_user_status(db_session, test_user.id, UserStatus.INACTIVE)
+    assert verify_api_key(db_session, api_key.key) is None
+
+def test_deactivating_api_key_keeps_other_keys_cached(db_session, test_user):
+    """Test that cache invalidation only drops the deactivated key"""
+    kept = create_api_key(db=db_session, name="kept", user_id=test_user.id)
+    dropped = create_api_key(db=db_session, name="dropped", user_id=test_user.id)
+    db_session.commit()
+    verify_api_key(db_session, kept.key)
+    verify_api_key(db_session, dropped.key)
+
+    invalidate_api_key_cache(key_id=dropped.id)
+
+    assert hash_api_key(kept.key) in _verified_keys
+    assert hash_api_key(dropped.key) not in _verified_keys
+
+def test_create_api_key_rejects_invalid_requests(db_session, test_user):
+    """Test that duplicate names, unknown users and inactive users are rejected"""
+    create_api_key(db=db_session, name="duplicate", user_id=test_user.id)
+    db_session.commit()
+
+    with pytest.raises(ValueError, match="already exists"):
+        create_api_key(db=db_session, name="duplicate", user_id=test_user.id)
+    with pytest.raises(ValueError, match="does not exist"):
+        create_api_key(db=db_session, name="orphan", user_id=-1)
+
+    update_user_status(db_session, test_user.id, UserStatus.INACTIVE)
+    with pytest.raises(ValueError, match="is not active"):
+        create_api_key(db=db_session, name="inactive", user_id=test_user.id)
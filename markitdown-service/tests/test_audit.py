@@ -0,0 +1,38 @@
+import json
+import logging
+import queue
+from app.core.audit.audit import AuditFileHandler, AuditQueueHandler, AuditQueueListener
+from app.core.logging.formatters import AuditFormatter
+
+def test_audit_listener_batches_writes(tmp_path):
+    """Test that records are buffered while queued and written once the queue drains"""
+    log_file = tmp_path / "audit.log"
+    handler = AuditFileHandler(filename=str(log_file), when="midnight", encoding="utf-8")
+    handler.setFormatter(AuditFormatter())
+    listener = AuditQueueListener(queue.SimpleQueue(), handler)
+    logger = logging.getLogger("test_audit_listener")
+    logger.propagate = False
+    logger.addHandler(AuditQueueHandler(listener.queue))
+
+    try:
+        for index in range(3):
+            logger.warning({"action": "test", "user_id": str(index), "status": "success"})
+        # Not started yet, emitting records without flushing leaves the file empty
+        handler.emit(listener.queue.get())
+        assert log_file.read_text() == ""
+
+        listener.start()
+        listener.stop()
+    finally:
+        logger.handlers.clear()
+        handler.close()
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [entry["user_id"] for entry in entries] == ["0", "1", "2"]
+
+def test_audit_formatter_timestamp():
+    """Test that timestamps are ISO 8601 UTC with microseconds, also within a cached second"""
+    formatter = AuditFormatter()
+    assert formatter.format_timestamp(1700000000.25) == "2023-11-14T22:13:20.250000+00:00"
+    assert formatter.format_timestamp(1700000000.5) == "2023-11-14T22:13:20.500000+00:00"
+    assert formatter.format_timestamp(1700000001.0) == "2023-11-14T22:13:21.000000+00:00"
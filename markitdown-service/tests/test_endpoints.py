@@ -4,15 +4,49 @@ import pytest
 from fastapi.testclient import TestClient
 from typing import Generator, Dict
 import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from app.main import app
 from app.core.config import settings
 from app.models.auth.api_key import Role, APIKey
 from app.core.rate_limiting.limiter import limiter
+from app.api.v1.endpoints import conversion
+from app.core.audit import AuditAction
 
 # Test file path
 TEST_FILE_PATH = Path(__file__).parent / "test_files" / "TestDoc.docx"
 
+@pytest.fixture
+def etag_server() -> Generator:
+    """Serve an HTML page with an ETag, recording the conditional requests"""
+    conditional_requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            conditional_requests.append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = b"<html><body><h1>Cached Page</h1></body></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/page", conditional_requests
+    server.shutdown()
+    server.server_close()
+
 class TestNoAuthAPI:
     """Test API endpoints without authentication required"""
     
@@ -28,6 +62,27 @@ class TestNoAuthAPI:
         assert data["status"] == "healthy"
         assert data["auth_enabled"] is False
 
+    def test_health_check_probe_is_cached(self, monkeypatch) -> None:
+        """Test that a healthy probe result is reused within the cache TTL"""
+        import app.main as main
+        calls = []
+        monkeypatch.setattr(main, "_last_healthy_probe", float("-inf"))
+        monkeypatch.setattr(settings, "HEALTH_CHECK_CACHE_TTL", 60)
+        monkeypatch.setattr(
+            main,
+            "check_log_directory",
+            lambda log_dir: calls.append(log_dir) or ("healthy", None)
+        )
+        audited = []
+        monkeypatch.setattr(main, "audit_log", lambda **kwargs: audited.append(kwargs["action"]))
+        for _ in range(2):
+            response = self.client.get("/health")
+            assert response.status_code == 200
+            assert response.json()["logging"]["status"] == "healthy"
+
+        assert len(calls) == 1
+        assert audited == [AuditAction.HEALTH_CHECK]
+
     def test_convert_file_no_auth(self) -> None:
         """Test file conversion without authentication"""
         assert TEST_FILE_PATH.exists(), f"Test file not found: {TEST_FILE_PATH}"
@@ -40,6 +95,15 @@ class TestNoAuthAPI:
         assert response.text  # Should contain markdown content
         assert "# " in response.text  # Basic check for markdown headers
 
+    def test_public_convert_file(self) -> None:
+        """Test file conversion through the public endpoint"""
+        with open(TEST_FILE_PATH, "rb") as f:
+            files = {"file": ("TestDoc.docx", f, "application/vnd.openxmlformats-officedocument.wordprocessingml.document")}
+            response = self.client.post("/public/api/v1/convert/file", files=files)
+        
+        assert response.status_code == 200
+        assert "# " in response.text
+
     def test_convert_text_no_auth(self) -> None:
         """Test text conversion without authentication"""
         test_html = "<h1>Test Header</h1><p>Test paragraph</p>"
@@ -52,6 +116,71 @@ class TestNoAuthAPI:
         assert "# Test Header" in response.text
         assert "Test paragraph" in response.text
 
+    def test_convert_text_is_cached(self, monkeypatch) -> None:
+        """Test that identical content is only converted once"""
+        calls = []
+        process_conversion = conversion.process_conversion
+        monkeypatch.setattr(
+            conversion,
+            "process_conversion",
+            lambda *args, **kwargs: calls.append(args) or process_conversion(*args, **kwargs)
+        )
+        for _ in range(2):
+            response = self.client.post(
+                "/api/v1/convert/text",
+                json={"content": "<h1>Cached Header</h1><p>Converted once</p>"}
+            )
+            assert response.status_code == 200
+            assert "# Cached Header" in response.text
+
+        assert len(calls) == 1
+
+    def test_request_body_size_limit(self, monkeypatch) -> None:
+        """Test that oversized bodies are rejected whether or not they declare a length"""
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", 16)
+        oversized = b"x" * (128 * 1024)
+        response = self.client.post(
+            "/api/v1/convert/file",
+            files={"file": ("big.txt", oversized, "text/plain")}
+        )
+        assert response.status_code == 413
+
+        response = self.client.post(
+            "/api/v1/convert/text",
+            content=iter([oversized]),
+            headers={"content-type": "application/json"}
+        )
+        assert response.status_code == 413
+        assert "exceeds maximum limit" in response.json()["detail"]
+
+    def test_convert_url_revalidates_cache(self, etag_server) -> None:
+        """Test that a repeated URL conversion is served from cache on 304"""
+        url, conditional_requests = etag_server
+        for _ in range(2):
+            response = self.client.post("/api/v1/convert/url", json={"url": url})
+            assert response.status_code == 200
+            assert "# Cached Page" in response.text
+
+        assert conditional_requests == [None, '"v1"']
+
+    def test_convert_url_skips_caching_large_conversions(self, etag_server, monkeypatch) -> None:
+        """Test that conversions over the per item budget are not cached"""
+        url, conditional_requests = etag_server
+        monkeypatch.setattr(settings, "CONVERSION_CACHE_MAX_ITEM_BYTES", 16)
+        for _ in range(2):
+            response = self.client.post("/api/v1/convert/url", json={"url": url})
+            assert response.status_code == 200
+
+        assert conditional_requests == [None, None]
+
+    def test_convert_url_size_limit(self, etag_server, monkeypatch) -> None:
+        """Test that URL content over the size limit is rejected"""
+        url, _ = etag_server
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", 16)
+        response = self.client.post("/api/v1/convert/url", json={"url": url})
+        assert response.status_code == 400
+        assert "exceeds maximum limit" in response.json()["detail"]
+
     def test_convert_url_bbc_no_auth(self) -> None:
         """Test BBC News URL conversion without authentication"""
         test_url = "https://www.bbc.co.uk/news/articles/c5ygv2y2e1eo"
@@ -276,5 +405,69 @@ class TestAuthAPI:
         assert response.status_code == 403
         assert "API key required" in response.json()["detail"]
 
+    def test_rate_limit_counts_request_once(self) -> None:
+        """Test that each request is counted once against the rate limit"""
+        limit = settings.TEST_RATE_LIMIT_DEFAULT_RATE
+        for expected_remaining in range(limit - 1, -1, -1):
+            response = self.client.post(
+                "/api/v1/convert/text",
+                json={"content": "<h1>Test</h1>"},
+                headers=self.headers
+            )
+            assert response.status_code == 200
+            assert response.headers["X-RateLimit-Remaining"] == str(expected_remaining)
+            assert "RateLimit-Remaining" not in response.headers
+            assert response.headers["RateLimit-Policy"] == f"{limit};w={settings.TEST_RATE_LIMIT_DEFAULT_PERIOD}"
+
+        response = self.client.post(
+            "/api/v1/convert/text",
+            json={"content": "<h1>Test</h1>"},
+            headers=self.headers
+        )
+        assert response.status_code == 429
+        assert response.json() == {
+            "detail": "Rate limit exceeded",
+            "retry_after": int(response.headers["Retry-After"])
+        }
+
+    def test_public_convert_file_rate_limit(self) -> None:
+        """Test that the public endpoint is limited by its own RATE_LIMITS entry"""
+        settings.RATE_LIMITS = {
+            **settings.RATE_LIMITS,
+            "/public/api/v1/convert/file": {"rate": 2, "per": 60}
+        }
+        for expected_status in (200, 200, 429):
+            with open(TEST_FILE_PATH, "rb") as f:
+                files = {"file": ("TestDoc.docx", f, "application/vnd.openxmlformats-officedocument.wordprocessingml.document")}
+                response = self.client.post("/public/api/v1/convert/file", files=files)
+            assert response.status_code == expected_status
+            assert response.headers["X-RateLimit-Limit"] == "2"
+
+    def test_rate_limit_buckets_per_api_key(self) -> None:
+        """Test that keys used from the same address are limited separately"""
+        limit = settings.TEST_RATE_LIMIT_DEFAULT_RATE
+        for _ in range(limit):
+            response = self.client.post(
+                "/api/v1/convert/text",
+                json={"content": "<h1>Test</h1>"},
+                headers=self.headers
+            )
+            assert response.status_code == 200
+
+        response = self.client.post(
+            "/api/v1/convert/text",
+            json={"content": "<h1>Test</h1>"},
+            headers=self.headers
+        )
+        assert response.status_code == 429
+
+        # Another key from the same client still has its own limit
+        response = self.client.post(
+            "/api/v1/convert/text",
+            json={"content": "<h1>Test</h1>"},
+            headers={settings.API_KEY_HEADER_NAME: self.admin_key}
+        )
+        assert response.status_code == 200
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
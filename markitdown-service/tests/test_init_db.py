@@ -0,0 +1,16 @@
+from sqlalchemy import inspect
+from app.db.init_db import create_missing_tables
+from app.db.session import get_engine
+from app.models.auth.api_key import APIKey
+
+def test_create_missing_tables():
+    """Test that only tables missing from the database are created"""
+    engine = get_engine()
+    assert create_missing_tables(engine) == []
+
+    APIKey.__table__.drop(engine)
+    try:
+        assert create_missing_tables(engine) == [APIKey.__tablename__]
+    finally:
+        APIKey.__table__.create(engine, checkfirst=True)
+    assert APIKey.__tablename__ in inspect(engine).get_table_names()
@@ -0,0 +1,37 @@
+import gzip
+from datetime import datetime, timedelta
+from app.core.logging.management import LogManager
+
+def test_cleanup_old_logs(tmp_path):
+    """Test that rotated logs past their retention period are removed"""
+    manager = LogManager(str(tmp_path))
+    retention_days = manager.get_retention_days("app")
+    old = datetime.now() - timedelta(days=retention_days + 1)
+    recent = datetime.now()
+
+    names = {
+        f"app_{old.strftime('%Y-%m-%d')}.log.gz": False,
+        f"app_test-{old.strftime('%Y%m%d')}.log.gz": False,
+        f"app_{recent.strftime('%Y-%m-%d')}.log.gz": True,
+        f"app_test-{recent.strftime('%Y%m%d')}.log.gz": True,
+        "app_test.log": True,
+        "notes.log.gz": True
+    }
+    for name in names:
+        (tmp_path / name).touch()
+
+    manager.cleanup_old_logs()
+
+    for name, kept in names.items():
+        assert (tmp_path / name).exists() == kept, name
+
+def test_rotate_log(tmp_path):
+    """Test that rotating a log compresses its content and truncates it"""
+    manager = LogManager(str(tmp_path))
+    manager.get_log_path("app").write_text("line\n" * 100)
+
+    manager.rotate_log("app")
+
+    rotated = manager.get_log_path("app", datetime.now()).with_suffix(".log.gz")
+    assert gzip.decompress(rotated.read_bytes()) == b"line\n" * 100
+    assert manager.get_log_size("app") == 0
@@ -0,0 +1,241 @@
+from types import SimpleNamespace
+import asyncio
+import pytest
+from fastapi import Request, Response
+from app.core.config import settings
+from app.core.rate_limiting.limiter import (
+    RateLimiter,
+    add_rate_limit_headers,
+    is_excluded_path,
+    get_path_rate_limits
+)
+from app.core.rate_limiting.concurrency import ConcurrencyLimiter
+from app.core.errors.exceptions import ServiceBusyError
+
+def make_request(host: str = "127.0.0.1", path: str = "/api/v1/convert/text") -> Request:
+    """Build a minimal FastAPI request"""
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": (host, 50000),
+        "path": path,
+        "query_string": b"",
+        "headers": []
+    })
+
+def test_rate_limit_allows_up_to_rate():
+    """Test that requests are allowed until the rate is used up"""
+    limiter = RateLimiter()
+    request = make_request()
+
+    for expected_remaining in (2, 1, 0):
+        is_allowed, limit_info = limiter.check_rate_limit(request, Response(), rate=3, per=60)
+        assert is_allowed
+        assert limit_info["remaining"] == expected_remaining
+
+    is_allowed, limit_info = limiter.check_rate_limit(request, Response(), rate=3, per=60)
+    assert not is_allowed
+    assert limit_info["remaining"] == 0
+    assert limit_info["limit"] == 3
+
+def test_rate_limit_buckets_are_independent():
+    """Test that one client using up its limit does not affect another"""
+    limiter = RateLimiter()
+    first, second = make_request("10.0.0.1"), make_request("10.0.0.2")
+
+    assert limiter.check_rate_limit(first, Response(), rate=1, per=60)[0]
+    assert not limiter.check_rate_limit(first, Response(), rate=1, per=60)[0]
+    assert limiter.check_rate_limit(second, Response(), rate=1, per=60)[0]
+
+def test_rate_limit_reset():
+    """Test that reset clears all buckets"""
+    limiter = RateLimiter()
+    request = make_request()
+
+    assert limiter.check_rate_limit(request, Response(), rate=1, per=60)[0]
+    assert not limiter.check_rate_limit(request, Response(), rate=1, per=60)[0]
+    limiter.reset()
+    assert limiter.check_rate_limit(request, Response(), rate=1, per=60)[0]
+
+def test_rate_limit_sliding_window(monkeypatch):
+    """Test that the previous window still counts against the limit after a boundary"""
+    limiter = RateLimiter()
+    request = make_request()
+    now = [600.0]
+    monkeypatch.setattr("app.core.rate_limiting.limiter.time.time", lambda: now[0])
+
+    for _ in range(10):
+        assert limiter.check_rate_limit(request, Response(), rate=10, per=60)[0]
+
+    # Right after the boundary the full previous window still overlaps
+    now[0] = 660.0
+    is_allowed, limit_info = limiter.check_rate_limit(request, Response(), rate=10, per=60)
+    assert not is_allowed
+    assert limit_info["retry_after"] == 1
+
+    # Halfway through, half of the previous window has slid out
+    now[0] = 690.0
+    allowed = sum(
+        limiter.check_rate_limit(request, Response(), rate=10, per=60)[0]
+        for _ in range(10)
+    )
+    assert allowed == 5
+
+def test_rate_limit_expired_buckets_are_swept(monkeypatch):
+    """Test that buckets are dropped once both of their windows have passed"""
+    limiter = RateLimiter(shard_count=1, sweep_interval=60)
+    now = [600.0]
+    monkeypatch.setattr("app.core.rate_limiting.limiter.time.time", lambda: now[0])
+
+    assert not limiter.check_rate_limit(make_request("10.0.0.1"), Response(), rate=0, per=60)[0]
+    assert len(limiter.shards[0].buckets) == 1
+
+    # The previous window still counts, so the bucket must be kept
+    now[0] = 660.0
+    limiter.check_rate_limit(make_request("10.0.0.2"), Response(), rate=1, per=60)
+    assert len(limiter.shards[0].buckets) == 2
+
+    now[0] = 720.0
+    limiter.check_rate_limit(make_request("10.0.0.2"), Response(), rate=1, per=60)
+    assert list(limiter.shards[0].buckets) == ["ip_10.0.0.2"]
+
+def test_rate_limit_max_keys():
+    """Test that the number of tracked clients is capped"""
+    limiter = RateLimiter(shard_count=1, max_keys=2, sweep_interval=3600)
+
+    for host in ("10.0.0.1", "10.0.0.2", "10.0.0.1"):
+        limiter.check_rate_limit(make_request(host), Response(), rate=5, per=60, now=1000)
+
+    # A full shard evicts its least recently used bucket for a new client
+    is_allowed, _ = limiter.check_rate_limit(
+        make_request("10.0.0.3"), Response(), rate=5, per=60, now=1000
+    )
+    assert is_allowed
+    assert list(limiter.shards[0].buckets) == ["ip_10.0.0.1", "ip_10.0.0.3"]
+
+    # The remaining bucket keeps its count
+    _, limit_info = limiter.check_rate_limit(
+        make_request("10.0.0.1"), Response(), rate=5, per=60, now=1000
+    )
+    assert limit_info["remaining"] == 2
+
+    # Expired buckets are swept right away rather than at the next periodic sweep
+    limiter.check_rate_limit(make_request("10.0.0.4"), Response(), rate=5, per=60, now=1100)
+    assert list(limiter.shards[0].buckets) == ["ip_10.0.0.4"]
+
+def test_excluded_paths(monkeypatch):
+    """Test prefix matching of excluded endpoints"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_EXCLUDED_ENDPOINTS", ["/api/v1/docs", "/health"])
+
+    assert is_excluded_path("/api/v1/docs/oauth2-redirect")
+    assert is_excluded_path("/health")
+    assert not is_excluded_path("/api/v1/convert/text")
+    assert not is_excluded_path("/public/health")
+
+    # Entries are plain prefixes, so the default "/api/v1/admin/*" entry
+    # doesn't exempt admin endpoints from rate limiting
+    monkeypatch.setattr(settings, "RATE_LIMIT_EXCLUDED_ENDPOINTS", ["/api/v1/admin/*"])
+    assert not is_excluded_path("/api/v1/admin/users")
+
+def test_path_rate_limits(monkeypatch):
+    """Test that the longest matching prefix wins and unmatched paths get the defaults"""
+    monkeypatch.setattr(settings, "RATE_LIMITS", {
+        "/api/v1/convert": {"rate": 10, "per": 60},
+        "/api/v1/convert/url": {"rate": 2, "per": 60}
+    })
+
+    assert get_path_rate_limits("/api/v1/convert/url")["rate"] == 2
+    assert get_path_rate_limits("/api/v1/convert/text")["rate"] == 10
+    assert get_path_rate_limits("/other") == {
+        "rate": settings.RATE_LIMIT_DEFAULT_RATE,
+        "per": settings.RATE_LIMIT_DEFAULT_PERIOD
+    }
+
+def test_rate_limit_rejections_are_sampled(monkeypatch):
+    """Test that rejections are logged once per period with a count of the suppressed ones"""
+    limiter = RateLimiter()
+    request = make_request()
+    now = [600.0]
+    monkeypatch.setattr("app.core.rate_limiting.limiter.time.time", lambda: now[0])
+
+    _, limit_info = limiter.check_rate_limit(request, Response(), rate=0, per=60)
+    assert limiter.sample_rejection(limit_info["key"], per=60) == 0
+    assert limiter.sample_rejection(limit_info["key"], per=60) is None
+    assert limiter.sample_rejection(limit_info["key"], per=60) is None
+
+    now[0] = 660.0
+    assert limiter.sample_rejection(limit_info["key"], per=60) == 2
+
+def test_add_rate_limit_headers_replaces_existing():
+    """Test that adding headers twice leaves a single copy of each"""
+    limiter = RateLimiter()
+    response = Response()
+    _, limit_info = limiter.check_rate_limit(make_request(), response, rate=2, per=60)
+    add_rate_limit_headers(response, limit_info)
+    _, limit_info = limiter.check_rate_limit(make_request(), response, rate=2, per=60)
+    add_rate_limit_headers(response, limit_info)
+
+    assert response.headers.getlist("X-RateLimit-Remaining") == ["0"]
+    assert response.headers["X-RateLimit-Limit"] == "2"
+    assert response.headers["RateLimit-Policy"] == "2;w=60"
+
+def test_rate_limit_bucket_key():
+    """Test that requests are keyed by API key once authenticated, by IP otherwise"""
+    limiter = RateLimiter()
+    request = make_request("10.0.0.1")
+    assert limiter.check_rate_limit(request, None, rate=1, per=60)[1]["key"] == "ip_10.0.0.1"
+
+    request.state.api_key = SimpleNamespace(id=42)
+    assert limiter.check_rate_limit(request, None, rate=1, per=60)[1]["key"] == "key_42"
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_rejects_over_limit():
+    """Test that conversions beyond the limit are rejected once the queue timeout runs out"""
+    limiter = ConcurrencyLimiter(initial=2, minimum=1, maximum=4, latency_target=60, queue_timeout=0.01)
+
+    async with limiter.acquire(), limiter.acquire():
+        with pytest.raises(ServiceBusyError) as exc_info:
+            async with limiter.acquire():
+                pass
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": "1"}
+    assert limiter.in_flight == 0
+    assert not limiter.waiters
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_waits_for_slot():
+    """Test that a request at the limit gets the slot freed within the queue timeout"""
+    limiter = ConcurrencyLimiter(initial=1, minimum=1, maximum=4, latency_target=60, queue_timeout=5)
+    order = []
+
+    async def convert(name: str, duration: float):
+        async with limiter.acquire():
+            order.append(name)
+            await asyncio.sleep(duration)
+
+    await asyncio.gather(convert("first", 0.05), convert("second", 0))
+    assert order == ["first", "second"]
+    assert limiter.in_flight == 0
+
+def test_concurrency_limiter_aimd():
+    """Test that the limit changes once per window, from the window's p95"""
+    limiter = ConcurrencyLimiter(initial=4, minimum=2, maximum=5, latency_target=1.0, window=10)
+
+    # A burst of slow conversions within one window only halves the limit once
+    for now in range(10):
+        limiter.record(2.0, now=now)
+    assert limiter.limit == 4
+    limiter.record(2.0, now=10)
+    assert limiter.limit == 2
+
+    # A single slow conversion among 20 fast ones stays above the p95
+    for index in range(21):
+        limiter.record(30.0 if index == 5 else 0.5, now=10.5 + index * 0.5)
+    assert limiter.limit == 3
+    limiter.record(0.5, now=40)
+    limiter.record(0.5, now=50)
+    limiter.record(0.5, now=60)
+    assert limiter.limit == 5
@@ -1,13 +1,18 @@
+import io
+import tempfile
 import pytest
+from fastapi import UploadFile
 from app.core.validation.validators import (
     validate_file_size,
     validate_file_extension,
     validate_content_type,
     validate_file_content,
     validate_upload_file,
+    validate_upload_stream,
     validate_text_input
 )
 from app.core.errors.exceptions import FileProcessingError, ContentTypeError
+from app.core.config.settings import settings
 from unittest.mock import AsyncMock, MagicMock
 
 def test_validate_file_size_success():
@@ -44,6 +49,10 @@ def test_validate_file_extension_success():
     assert validate_file_extension('test.TXT', allowed_extensions) == '.txt'
     assert validate_file_extension('test.MD', allowed_extensions) == '.md'
 
+    # Test that only the basename is considered
+    assert validate_file_extension('dir.v2/test.txt', allowed_extensions) == '.txt'
+    assert validate_file_extension('dir.v2\\test.md', allowed_extensions) == '.md'
+
 def test_validate_file_extension_failure():
     """Test file extension validation with invalid extensions"""
     allowed_extensions = {'.txt', '.md', '.doc'}
@@ -58,6 +67,17 @@ def test_validate_file_extension_failure():
         validate_file_extension('test', allowed_extensions)
     assert "No file extension" in str(exc_info.value)
 
+    # Test with a dot in a directory name only
+    with pytest.raises(FileProcessingError) as exc_info:
+        validate_file_extension('dir.v2/file', allowed_extensions)
+    assert "No file extension" in str(exc_info.value)
+
+    # Test with a dotfile
+    for filename in ('.env', '.md', 'dir/.txt'):
+        with pytest.raises(FileProcessingError) as exc_info:
+            validate_file_extension(filename, allowed_extensions)
+        assert "No file extension" in str(exc_info.value)
+
 def test_validate_content_type_success():
     """Test content type validation with valid types"""
     # Test with allowed content types
@@ -107,8 +127,8 @@ class MockUploadFile:
         self._content = content
         self._position = 0
 
-    async def read(self) -> bytes:
-        return self._content
+    async def read(self, size: int = -1) -> bytes:
+        return self._content if size < 0 else self._content[:size]
 
     async def seek(self, position: int) -> None:
         self._position = position
@@ -189,3 +209,68 @@ async def test_validate_text_input_failure_size_exceeded():
     with pytest.raises(FileProcessingError) as exc_info:
         await validate_text_input(content=large_content)
     assert "exceeds maximum limit" in str(exc_info.value)
+
+def test_validate_file_extension_default(monkeypatch):
+    """Test that the default extensions follow settings.SUPPORTED_EXTENSIONS"""
+    assert validate_file_extension('test.PDF') == '.pdf'
+
+    monkeypatch.setattr(settings, "SUPPORTED_EXTENSIONS", ['.MD'])
+    assert validate_file_extension('test.md') == '.md'
+    with pytest.raises(FileProcessingError):
+        validate_file_extension('test.pdf')
+
+@pytest.mark.asyncio
+async def test_validate_upload_file_failure_size_exceeded():
+    """Test that oversized uploads are rejected without being read whole"""
+    file = MockUploadFile(
+        filename="test.txt",
+        content_type="text/plain",
+        content=b"x" * (settings.MAX_FILE_SIZE + 1024)
+    )
+    file.read = AsyncMock(wraps=file.read)
+
+    with pytest.raises(FileProcessingError) as exc_info:
+        await validate_upload_file(file=file)
+    assert "exceeds maximum limit" in str(exc_info.value)
+    file.read.assert_awaited_once_with(settings.MAX_FILE_SIZE + 1)
+
+    # A known size is rejected before reading anything
+    file.size = settings.MAX_FILE_SIZE + 1024
+    file.read.reset_mock()
+    with pytest.raises(FileProcessingError):
+        await validate_upload_file(file=file)
+    file.read.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_validate_upload_stream():
+    """Test that spooled uploads are validated by size and handed over as a buffered stream"""
+    content = b"x" * 64
+    spooled = tempfile.SpooledTemporaryFile(max_size=16)
+    spooled.write(content)
+    file = UploadFile(spooled, size=len(content), filename="test.txt")
+
+    ext, stream = await validate_upload_stream(file=file)
+    assert ext == '.txt'
+    assert isinstance(stream, io.BufferedIOBase)
+    with stream:
+        assert stream.read() == content
+    # The stream is the caller's own, closing it leaves the upload usable
+    assert not spooled.closed
+
+    # Spools still held in memory and plain in-memory files work as well
+    for spooled_file in (tempfile.SpooledTemporaryFile(max_size=1024), io.BytesIO()):
+        spooled_file.write(content)
+        _, stream = await validate_upload_stream(
+            file=UploadFile(spooled_file, size=len(content), filename="test.txt")
+        )
+        with stream:
+            assert isinstance(stream, io.BufferedIOBase)
+            assert stream.read() == content
+
+    file.size = 0
+    with pytest.raises(FileProcessingError, match="Empty file provided"):
+        await validate_upload_stream(file=file)
+
+    file.size = settings.MAX_FILE_SIZE + 1
+    with pytest.raises(FileProcessingError, match="exceeds maximum limit"):
+        await validate_upload_stream(file=file)